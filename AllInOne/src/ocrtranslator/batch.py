@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+from .change_detector import FrameChangeDetector
+from .config import OCRConfig, RegionConfig, TranslationConfig
+from .logger import TranscriptLogger, format_media_time
+from .preprocess import parse_steps
+from .roi import Rect, clamp_roi, crop, default_dialogue_roi, parse_regions, parse_roi
+from .text_filter import TextDeduplicator
+
+# Lines per translate_many call when translating the merged transcript.
+_TRANSLATE_BATCH = 25
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    index: int
+    path: str
+    start_frame: int
+    end_frame: int
+    stride: int
+    rects: Tuple[Rect, ...]
+    thresholds: Tuple[Optional[int], ...]
+    change_gate: bool
+    change_pixel_delta: int
+    change_min_ratio: float
+
+
+@dataclass
+class _ChunkResult:
+    index: int
+    # (frame index, region index, text) for every OCR reading.
+    readings: List[Tuple[int, int, str]] = field(default_factory=list)
+    decoded: int = 0
+    sampled: int = 0
+    ocr_calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class BatchStats:
+    frames: int = 0
+    sampled: int = 0
+    ocr_calls: int = 0
+    readings: int = 0
+    lines: int = 0
+    media_sec: float = 0.0
+    ocr_sec: float = 0.0
+    translate_sec: float = 0.0
+    total_sec: float = 0.0
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.total_sec if self.total_sec > 0 else 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.media_sec / self.total_sec if self.total_sec > 0 else 0.0
+
+
+_worker_ocr: Any = None
+
+
+def _init_worker(config: OCRConfig) -> None:
+    # Ctrl+C reaches the whole process group; the parent cancels the pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The pool already uses one process per core.
+    cv2.setNumThreads(1)
+    global _worker_ocr
+    from .ocr_engine import OCRProcessor
+
+    _worker_ocr = OCRProcessor(config)
+
+
+def _process_chunk(chunk: _Chunk) -> _ChunkResult:
+    started = time.perf_counter()
+    result = _ChunkResult(index=chunk.index)
+    detectors: List[Optional[FrameChangeDetector]] = [
+        FrameChangeDetector(pixel_delta=chunk.change_pixel_delta, min_changed_ratio=chunk.change_min_ratio)
+        if chunk.change_gate
+        else None
+        for _ in chunk.rects
+    ]
+
+    cap = cv2.VideoCapture(chunk.path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video file: {chunk.path}")
+    try:
+        if chunk.start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.start_frame)
+        for frame_index in range(chunk.start_frame, chunk.end_frame):
+            # Frames between samples are only grabbed, never converted.
+            # Sampling is aligned to absolute frame numbers, so chunk
+            # boundaries do not shift it.
+            if frame_index % chunk.stride:
+                if not cap.grab():
+                    break
+                result.decoded += 1
+                continue
+            ok, frame = cap.read()
+            if not ok or frame is None:
+                break
+            result.decoded += 1
+            result.sampled += 1
+
+            changed: List[int] = []
+            images = []
+            for region_index, (rect, detector) in enumerate(zip(chunk.rects, detectors)):
+                image = crop(frame, rect)
+                if detector is None or detector.has_changed(image):
+                    changed.append(region_index)
+                    images.append(image)
+            if not changed:
+                continue
+
+            result.ocr_calls += 1
+            texts = _worker_ocr.recognize_many(images, [chunk.thresholds[index] for index in changed])
+            for region_index, text in zip(changed, texts):
+                result.readings.append((frame_index, region_index, text))
+    finally:
+        cap.release()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _plan_chunks(
+    path: str,
+    frame_count: int,
+    fps: float,
+    chunk_sec: float,
+    stride: int,
+    regions: Sequence[RegionConfig],
+    config: OCRConfig,
+) -> List[_Chunk]:
+    # Chunks are a whole number of sample strides long, and there are many
+    # more of them than workers so a slow (text-heavy) stretch does not
+    # leave the other processes idle.
+    size = max(stride, int(round(chunk_sec * fps / stride)) * stride)
+    return [
+        _Chunk(
+            index=index,
+            path=path,
+            start_frame=start,
+            end_frame=min(frame_count, start + size),
+            stride=stride,
+            rects=tuple(region.rect for region in regions),
+            thresholds=tuple(region.threshold for region in regions),
+            change_gate=config.change_gate,
+            change_pixel_delta=config.change_pixel_delta,
+            change_min_ratio=config.change_min_ratio,
+        )
+        for index, start in enumerate(range(0, frame_count, size))
+    ]
+
+
+def _probe(path: str) -> Tuple[int, float, Any]:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video file: {path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        ok, frame = cap.read()
+    finally:
+        cap.release()
+    if not ok or frame is None:
+        raise RuntimeError(f"No frames in video file: {path}")
+    if frame_count <= 0:
+        frame_count = _count_frames(path)
+    return frame_count, fps, frame
+
+
+def _count_frames(path: str) -> int:
+    # Some containers do not store a frame count.
+    cap = cv2.VideoCapture(path)
+    count = 0
+    try:
+        while cap.grab():
+            count += 1
+    finally:
+        cap.release()
+    return count
+
+
+def _run_pool(chunks: Sequence[_Chunk], config: OCRConfig, processes: int) -> List[_ChunkResult]:
+    results: List[_ChunkResult] = []
+    total = len(chunks)
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(config,),
+    )
+    try:
+        pending = {executor.submit(_process_chunk, chunk) for chunk in chunks}
+        frames = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                frames += result.decoded
+                elapsed = time.perf_counter() - started
+                print(
+                    f"Chunk {len(results)}/{total}",
+                    f"frames={frames}",
+                    f"fps={frames / elapsed if elapsed > 0 else 0.0:.0f}",
+                    f"ocr_calls={result.ocr_calls}",
+                )
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    return sorted(results, key=lambda item: item.index)
+
+
+def _merge(
+    results: Sequence[_ChunkResult],
+    regions: Sequence[RegionConfig],
+    fps: float,
+) -> List[Tuple[float, int, str]]:
+    # Chunks restart their change gate, so their first readings repeat the
+    # previous chunk's last ones; the deduplicator, run in media time, drops
+    # those along with ordinary repeats.
+    dedupers = [TextDeduplicator(similarity_threshold=0.93, min_interval_sec=0.15) for _ in regions]
+    readings = sorted(
+        (reading for result in results for reading in result.readings),
+        key=lambda item: (item[0], item[1]),
+    )
+    lines: List[Tuple[float, int, str]] = []
+    for frame_index, region_index, text in readings:
+        media_time = frame_index / fps
+        if dedupers[region_index].should_emit(text, now=media_time):
+            lines.append((media_time, region_index, text))
+    return lines
+
+
+def _translate(lines: Sequence[Tuple[float, int, str]], config: TranslationConfig) -> Dict[str, str]:
+    from .translator import build_translator
+
+    unique = list(dict.fromkeys(text for _, _, text in lines))
+    translator = build_translator(config)
+    translations: Dict[str, str] = {}
+    try:
+        for start in range(0, len(unique), _TRANSLATE_BATCH):
+            batch = unique[start : start + _TRANSLATE_BATCH]
+            translations.update(zip(batch, translator.translate_many(batch)))
+    finally:
+        translator.close()
+    return translations
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py batch",
+        description="Transcribe and translate a recorded video offline, faster than real time",
+    )
+    parser.add_argument("video", type=str)
+    parser.add_argument("--roi", type=str, default=None, help="Dialogue ROI as x,y,w,h (default: lower dialogue box)")
+    parser.add_argument("--region", action="append", default=[], help="Named ROI as name=x,y,w,h[@threshold]")
+    parser.add_argument("--processes", type=int, default=0, help="OCR worker processes (default: half the cores)")
+    parser.add_argument("--sample-fps", type=float, default=10.0, help="Frames per second of video to look at")
+    parser.add_argument("--chunk-sec", type=float, default=30.0, help="Seconds of video per work item")
+    parser.add_argument("--no-change-gate", action="store_true", help="OCR every sampled frame")
+    parser.add_argument("--change-delta", type=int, default=24)
+    parser.add_argument("--change-ratio", type=float, default=0.0005)
+
+    parser.add_argument("--source-lang", type=str, default="ja")
+    parser.add_argument("--target-lang", type=str, default="ko")
+    parser.add_argument("--translator", type=str, default="google", choices=["google", "deepl", "none"])
+    parser.add_argument("--deepl-api-key", type=str, default=None)
+    parser.add_argument(
+        "--translation-cache",
+        type=str,
+        default=None,
+        help="Translation cache path (default <log-dir>/translations.sqlite3)",
+    )
+    parser.add_argument("--no-translation-cache", action="store_true")
+
+    parser.add_argument("--pre-scale", type=float, default=2.0)
+    parser.add_argument("--threshold", type=int, default=170)
+    parser.add_argument("--min-confidence", type=float, default=0.45)
+    parser.add_argument("--preprocess", type=str, default="gray,upscale,threshold,median")
+    parser.add_argument("--interpolation", type=str, default="cubic", choices=["nearest", "linear", "area", "cubic"])
+    parser.add_argument("--det-cache", action="store_true")
+
+    parser.add_argument("--log-dir", type=str, default="logs")
+    parser.add_argument("--log-source-only", action="store_true")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    started = time.perf_counter()
+
+    frame_count, fps, first_frame = _probe(args.video)
+    regions = parse_regions(args.region)
+    if regions:
+        regions = tuple(
+            RegionConfig(name=region.name, rect=clamp_roi(region.rect, first_frame), threshold=region.threshold)
+            for region in regions
+        )
+    else:
+        roi = parse_roi(args.roi) or default_dialogue_roi(first_frame)
+        regions = (RegionConfig(name="dialogue", rect=clamp_roi(roi, first_frame)),)
+
+    ocr_config = OCRConfig(
+        source_lang=args.source_lang,
+        pre_scale=args.pre_scale,
+        threshold=args.threshold,
+        min_confidence=args.min_confidence,
+        preprocess=parse_steps(args.preprocess),
+        interpolation=args.interpolation,
+        change_gate=not args.no_change_gate,
+        change_pixel_delta=args.change_delta,
+        change_min_ratio=args.change_ratio,
+        det_cache=args.det_cache,
+    )
+    from .translation_cache import DEFAULT_CACHE_NAME
+
+    translation_config = TranslationConfig(
+        engine=args.translator,
+        source_lang=args.source_lang,
+        target_lang=args.target_lang,
+        deepl_api_key=args.deepl_api_key or os.getenv("DEEPL_API_KEY"),
+        cache_enabled=not args.no_translation_cache,
+        cache_path=args.translation_cache or str(Path(args.log_dir) / DEFAULT_CACHE_NAME),
+        memory_seed_dir=args.log_dir,
+    )
+
+    stride = max(1, int(round(fps / max(args.sample_fps, 1e-3))))
+    chunks = _plan_chunks(args.video, frame_count, fps, args.chunk_sec, stride, regions, ocr_config)
+    processes = args.processes or max(1, (os.cpu_count() or 2) // 2)
+    processes = min(processes, len(chunks))
+    print(
+        "Batch",
+        f"video={args.video}",
+        f"frames={frame_count}",
+        f"fps={fps:.2f}",
+        f"duration={format_media_time(frame_count / fps)}",
+        f"sample_every={stride}",
+        f"chunks={len(chunks)}",
+        f"processes={processes}",
+        f"regions={[region.name for region in regions]}",
+    )
+
+    stats = BatchStats(media_sec=frame_count / fps)
+    step = time.perf_counter()
+    results = _run_pool(chunks, ocr_config, processes)
+    stats.ocr_sec = time.perf_counter() - step
+    stats.frames = sum(result.decoded for result in results)
+    stats.sampled = sum(result.sampled for result in results)
+    stats.ocr_calls = sum(result.ocr_calls for result in results)
+    stats.readings = sum(len(result.readings) for result in results)
+
+    lines = _merge(results, regions, fps)
+    stats.lines = len(lines)
+
+    step = time.perf_counter()
+    translations = _translate(lines, translation_config)
+    stats.translate_sec = time.perf_counter() - step
+
+    # Region names only appear in the transcript when there is more than one,
+    # as in live runs.
+    labels = [region.name if len(regions) > 1 else None for region in regions]
+    logger = TranscriptLogger(
+        log_dir=args.log_dir,
+        source_lang=args.source_lang,
+        target_lang=args.target_lang,
+        source_only=args.log_source_only,
+        rotate_bytes=0,
+    )
+    try:
+        for media_time, region_index, text in lines:
+            logger.log(text, translations.get(text, ""), region=labels[region_index], media_time=media_time)
+    finally:
+        logger.close()
+    stats.total_sec = time.perf_counter() - started
+
+    print(
+        "Done",
+        f"lines={stats.lines}",
+        f"readings={stats.readings}",
+        f"frames={stats.frames}",
+        f"sampled={stats.sampled}",
+        f"ocr_calls={stats.ocr_calls}",
+    )
+    print(
+        "Throughput",
+        f"fps={stats.fps:.0f}",
+        f"speedup={stats.speedup:.1f}x",
+        f"ocr={stats.ocr_sec:.1f}s",
+        f"translate={stats.translate_sec:.1f}s",
+        f"total={stats.total_sec:.1f}s",
+    )
+    print(f"Transcript: {logger.session_dir}")
+    return 0
@@ -0,0 +1,590 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .capture import CaptureWorker
+from .config import CaptureConfig, OCRConfig, TranslationConfig
+from .pipeline import PipelineWorker
+from .preprocess import Preprocessor, parse_steps
+from .roi import Rect, clamp_roi, crop, default_dialogue_roi, parse_roi
+from .similarity import is_similar, normalize_text
+from .sources import FrameSource, ReadResult, SyntheticTextSource, build_frame_source
+from .state import SharedOverlayState
+from .translator import BaseTranslator, build_translator
+
+
+_SIMILARITY_LINES = (
+    "Hello! Welcome to the world of monsters.",
+    "My name is Professor Oak. People call me the monster professor.",
+    "This world is inhabited by creatures that we call monsters.",
+    "ようこそ！ポケットモンスターの世界へ！",
+    "わたしの名前はオーキド。みんなからはポケモン博士と慕われておるよ。",
+    "この世界には、ポケットモンスターと呼ばれる生き物たちが至る所に住んでいる。",
+)
+
+_SIMILARITY_THRESHOLDS = (0.72, 0.85, 0.93)
+
+
+def stub_text(frame: np.ndarray) -> str:
+    # Identical pixels give identical "text" so the deduplicator behaves like
+    # it would with a real engine on a static dialogue box.
+    return f"text-{zlib.crc32(np.ascontiguousarray(frame).data):08x}"
+
+
+class StubOCR:
+    def __init__(self, latency_sec: float = 0.08, labels: Optional[Dict[str, str]] = None) -> None:
+        self._latency_sec = latency_sec
+        self._labels = labels if labels is not None else {}
+
+    def recognize(self, frame: np.ndarray) -> str:
+        time.sleep(self._latency_sec)
+        key = stub_text(frame)
+        return self._labels.get(key, key)
+
+    def recognize_many(self, frames: Sequence[np.ndarray], thresholds=None) -> List[str]:
+        # One batched call pays the latency once, like the stacked PaddleOCR pass.
+        time.sleep(self._latency_sec)
+        return [self._labels.get(stub_text(frame), stub_text(frame)) for frame in frames]
+
+    def close(self) -> None:
+        return
+
+
+class StubTranslator(BaseTranslator):
+    def __init__(self, latency_sec: float = 0.2) -> None:
+        self._latency_sec = latency_sec
+
+    def translate_strict(self, text: str) -> str:
+        time.sleep(self._latency_sec)
+        return f"<{text}>"
+
+
+class RecordingState(SharedOverlayState):
+    def __init__(self) -> None:
+        super().__init__()
+        # Any text going up, and translations alone (keyed by source text).
+        self.updates: List[Tuple[float, str]] = []
+        self.translations: List[Tuple[float, str]] = []
+
+    def show_source(self, line_id: int, source_text: str, region: Optional[str] = None) -> bool:
+        applied = super().show_source(line_id, source_text, region=region)
+        if applied:
+            self.updates.append((time.monotonic(), source_text))
+        return applied
+
+    def show_translation(
+        self,
+        line_id: int,
+        source_text: str,
+        translated_text: str,
+        region: Optional[str] = None,
+    ) -> bool:
+        applied = super().show_translation(line_id, source_text, translated_text, region=region)
+        if applied:
+            now = time.monotonic()
+            self.updates.append((now, source_text))
+            self.translations.append((now, source_text))
+        return applied
+
+    def update(self, source_text: str, translated_text: str, region: Optional[str] = None) -> None:
+        super().update(source_text=source_text, translated_text=translated_text, region=region)
+        self.updates.append((time.monotonic(), source_text))
+
+
+class ChangeRecordingSource(FrameSource):
+    def __init__(self, inner: FrameSource, roi: Optional[Rect]) -> None:
+        self._inner = inner
+        self._roi = roi
+        self._previous: Optional[np.ndarray] = None
+        self.changes: List[Tuple[float, str]] = []
+        # Pixel digest -> rendered text for synthetic sources, so the stub OCR
+        # can "read" the real dialogue and typewriter growth is visible.
+        self.labels: Dict[str, str] = {}
+
+    @property
+    def fps(self) -> float:  # type: ignore[override]
+        return self._inner.fps
+
+    @property
+    def roi(self) -> Optional[Rect]:
+        return self._roi
+
+    def open(self) -> None:
+        self._inner.open()
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        ok, frame = self._inner.read(out)
+        if ok and frame is not None:
+            self._track(frame)
+        return ok, frame
+
+    @property
+    def exhausted(self) -> bool:
+        return self._inner.exhausted
+
+    def release(self) -> None:
+        self._inner.release()
+
+    def describe(self) -> str:
+        return self._inner.describe()
+
+    def _track(self, frame: np.ndarray) -> None:
+        if self._roi is None:
+            self._roi = default_dialogue_roi(frame)
+        region = crop(frame, clamp_roi(self._roi, frame))
+        if self._previous is not None and self._previous.shape == region.shape:
+            if not np.any(cv2.absdiff(region, self._previous) > 8):
+                return
+        self._previous = region.copy()
+        key = stub_text(region)
+        text = getattr(self._inner, "current_text", None)
+        if text:
+            self.labels[key] = text
+        self.changes.append((time.monotonic(), self.labels.get(key, key)))
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    frac = pos - lower
+    return sorted_values[lower] * (1.0 - frac) + sorted_values[upper] * frac
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000.0, 3),
+        "p50_ms": round(_percentile(values, 0.50) * 1000.0, 3),
+        "p95_ms": round(_percentile(values, 0.95) * 1000.0, 3),
+        "p99_ms": round(_percentile(values, 0.99) * 1000.0, 3),
+        "max_ms": round(values[-1] * 1000.0, 3),
+    }
+
+
+def change_to_overlay(
+    changes: Sequence[Tuple[float, str]],
+    updates: Sequence[Tuple[float, str]],
+) -> Tuple[List[float], int]:
+    # With the stub OCR the overlay text identifies the exact screen change it
+    # came from. Real OCR text cannot be matched, so fall back to timing: a
+    # change counts as shown by the first update that lands before the next
+    # change. Changes never shown on the overlay are reported as missed.
+    keys = {key for _, key in changes}
+    by_text = any(text in keys for _, text in updates)
+
+    latencies: List[float] = []
+    missed = 0
+    for i, (changed_at, key) in enumerate(changes):
+        next_change = changes[i + 1][0] if i + 1 < len(changes) else float("inf")
+        shown_at = None
+        for updated_at, text in updates:
+            if updated_at < changed_at:
+                continue
+            if by_text and text == key:
+                shown_at = updated_at
+                break
+            if not by_text:
+                if updated_at < next_change:
+                    shown_at = updated_at
+                break
+        if shown_at is None:
+            missed += 1
+            continue
+        latencies.append(shown_at - changed_at)
+    return latencies, missed
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="ocrtranslator bench",
+        description="Measure capture -> OCR -> translate -> overlay latency",
+    )
+
+    parser.add_argument("--source", type=str, default="synthetic", choices=["video", "images", "synthetic"])
+    parser.add_argument("--source-path", type=str, default=None)
+    parser.add_argument("--fast", action="store_true", help="Feed frames as fast as possible")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--roi", type=str, default=None, help="Dialogue ROI as x,y,w,h")
+    parser.add_argument("--duration", type=float, default=10.0, help="Pipeline run time in seconds")
+    parser.add_argument("--hold-sec", type=float, default=2.0, help="Synthetic source: seconds per line")
+    parser.add_argument("--chars-per-sec", type=float, default=0.0, help="Synthetic source: typewriter speed")
+
+    parser.add_argument("--ocr", type=str, default="stub", choices=["stub", "paddle"])
+    parser.add_argument("--ocr-latency", type=float, default=0.08, help="Stub OCR latency in seconds")
+    parser.add_argument("--ocr-interval", type=float, default=0.35)
+    parser.add_argument("--scheduler", type=str, default="adaptive", choices=["adaptive", "fixed"])
+    parser.add_argument("--min-ocr-rate", type=float, default=3.0)
+    parser.add_argument("--max-ocr-rate", type=float, default=10.0)
+    parser.add_argument("--pre-scale", type=float, default=2.0)
+    parser.add_argument("--threshold", type=int, default=170)
+    parser.add_argument("--preprocess", type=str, default="gray,upscale,threshold,median")
+    parser.add_argument("--interpolation", type=str, default="cubic", choices=["nearest", "linear", "area", "cubic"])
+    parser.add_argument(
+        "--preprocess-variants",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Preprocess chains to time on the ROI, e.g. gray,upscale,threshold,median gray,lut,upscale:linear",
+    )
+    parser.add_argument("--preprocess-iterations", type=int, default=200)
+    parser.add_argument("--ocr-processes", type=int, default=0, help="Paddle OCR: worker processes (0 = in-process)")
+    parser.add_argument("--det-cache", action="store_true", help="Paddle OCR: recognition-only passes on cached boxes")
+    parser.add_argument(
+        "--similarity-iterations",
+        type=int,
+        default=0,
+        help="Micro-benchmark text similarity (SequenceMatcher vs is_similar) with this many rounds; exits 1 if they disagree",
+    )
+    parser.add_argument("--no-change-gate", action="store_true")
+    parser.add_argument("--typewriter-settle", type=float, default=0.0)
+    parser.add_argument("--rate-probe-sec", type=float, default=3.0, help="Back-to-back OCR time for max rate")
+
+    parser.add_argument("--translator", type=str, default="stub", choices=["stub", "google", "deepl", "none"])
+    parser.add_argument("--translate-latency", type=float, default=0.2, help="Stub translator latency in seconds")
+    parser.add_argument("--source-lang", type=str, default="en")
+    parser.add_argument("--target-lang", type=str, default="ko")
+    parser.add_argument("--deepl-api-key", type=str, default=None)
+
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+
+    return parser
+
+
+def _build_source(args: argparse.Namespace) -> FrameSource:
+    if args.source == "synthetic":
+        return SyntheticTextSource(
+            width=args.width,
+            height=args.height,
+            fps=args.fps,
+            hold_sec=args.hold_sec,
+            chars_per_sec=args.chars_per_sec,
+            realtime=not args.fast,
+            loop=True,
+        )
+    return build_frame_source(
+        CaptureConfig(
+            width=args.width,
+            height=args.height,
+            fps=args.fps,
+            source=args.source,
+            source_path=args.source_path,
+            realtime=not args.fast,
+            loop=True,
+        )
+    )
+
+
+def _probe_ocr_rate(ocr, capture: CaptureWorker, roi: Rect, seconds: float) -> float:
+    frame = capture.get_latest_roi(roi)
+    if frame is None or seconds <= 0:
+        return 0.0
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        ocr.recognize(frame.image)
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def benchmark_preprocess(
+    variants: Sequence[str],
+    frame: np.ndarray,
+    args: argparse.Namespace,
+) -> Dict[str, object]:
+    results: Dict[str, object] = {}
+    for spec in variants:
+        steps, _, interpolation = spec.partition(":")
+        preprocessor = Preprocessor(
+            steps=parse_steps(steps),
+            pre_scale=args.pre_scale,
+            threshold=args.threshold,
+            interpolation=interpolation or args.interpolation,
+        )
+        totals: List[float] = []
+        per_step: Dict[str, List[float]] = defaultdict(list)
+        output = frame
+        for _ in range(max(1, args.preprocess_iterations)):
+            started = time.perf_counter()
+            output = preprocessor.run(frame)
+            totals.append(time.perf_counter() - started)
+            for step, seconds in preprocessor.last_timings.items():
+                per_step[step].append(seconds)
+        results[spec] = {
+            "total": summarize(totals),
+            "steps": {step: summarize(values) for step, values in per_step.items()},
+            "output_shape": list(output.shape),
+        }
+    return results
+
+
+def _similarity_cases(seed: int = 7) -> Dict[str, List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+
+    def noisy(text: str, edits: int) -> str:
+        chars = list(text)
+        for _ in range(edits):
+            chars[rng.randrange(len(chars))] = rng.choice("l1I|0O.,")
+        return "".join(chars)
+
+    def straddling(text: str, threshold: float) -> List[Tuple[str, str]]:
+        # Edit a copy one character at a time (substitute, delete, insert)
+        # until it falls below threshold; keep the last pair above it and
+        # the first one below.
+        edited, above = list(text), text
+        while len(edited) > 1:
+            position = rng.randrange(len(edited))
+            kind = rng.randrange(3)
+            if kind == 0:
+                edited[position] = rng.choice("l1I|0O.,ー")
+            elif kind == 1:
+                del edited[position]
+            else:
+                edited.insert(position, rng.choice("l1I|0O.,ー"))
+            candidate = "".join(edited)
+            if SequenceMatcher(None, text, candidate).ratio() < threshold:
+                return [(text, above), (text, candidate)]
+            above = candidate
+        return []
+
+    lines = list(_SIMILARITY_LINES)
+    long_text = " ".join(lines * 3)
+    return {
+        "identical": [(line, line) for line in lines],
+        "ocr_noise": [(line, noisy(line, 2)) for line in lines],
+        "typewriter": [(line[: len(line) // 2], line) for line in lines],
+        "unrelated": [(a, b) for a, b in zip(lines, lines[1:] + lines[:1])],
+        "long_noise": [(long_text, noisy(long_text, 6))],
+        "long_unrelated": [(long_text, " ".join(reversed(lines)) * 3)],
+        "near_threshold": [
+            pair for line in lines for threshold in _SIMILARITY_THRESHOLDS for pair in straddling(line, threshold)
+        ],
+    }
+
+
+def benchmark_similarity(iterations: int) -> Dict[str, object]:
+    # Time a plain SequenceMatcher check against is_similar (LCS-bounded
+    # SequenceMatcher) for the thresholds the deduplicator, stabilizer and
+    # logger use, and count how often the two agree; they must always agree.
+    results: Dict[str, object] = {}
+    for name, pairs in _similarity_cases().items():
+        pairs = [(normalize_text(a), normalize_text(b)) for a, b in pairs]
+        checks = len(pairs) * len(_SIMILARITY_THRESHOLDS)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for a, b in pairs:
+                for threshold in _SIMILARITY_THRESHOLDS:
+                    SequenceMatcher(None, a, b).ratio() >= threshold
+        old_sec = (time.perf_counter() - started) / (iterations * checks)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for a, b in pairs:
+                for threshold in _SIMILARITY_THRESHOLDS:
+                    is_similar(a, b, threshold)
+        new_sec = (time.perf_counter() - started) / (iterations * checks)
+
+        agree = sum(
+            (SequenceMatcher(None, a, b).ratio() >= threshold) == is_similar(a, b, threshold)
+            for a, b in pairs
+            for threshold in _SIMILARITY_THRESHOLDS
+        )
+        results[name] = {
+            "sequence_matcher_us": round(old_sec * 1e6, 3),
+            "is_similar_us": round(new_sec * 1e6, 3),
+            "speedup": round(old_sec / new_sec, 2) if new_sec > 0 else None,
+            "agreement": round(agree / checks, 3),
+        }
+    return results
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    inner = _build_source(args)
+    roi = parse_roi(args.roi)
+    if roi is None and isinstance(inner, SyntheticTextSource):
+        roi = inner.dialogue_roi
+    source = ChangeRecordingSource(inner, roi)
+
+    ocr_config = OCRConfig(
+        source_lang=args.source_lang,
+        ocr_interval_sec=args.ocr_interval,
+        pre_scale=args.pre_scale,
+        threshold=args.threshold,
+        preprocess=parse_steps(args.preprocess),
+        interpolation=args.interpolation,
+        change_gate=not args.no_change_gate,
+        typewriter_settle_sec=args.typewriter_settle,
+        det_cache=args.det_cache,
+        processes=args.ocr_processes,
+        scheduler=args.scheduler,
+        min_rate_hz=args.min_ocr_rate,
+        max_rate_hz=args.max_ocr_rate,
+    )
+    if args.ocr == "paddle":
+        from .ocr_process import build_ocr_processor
+
+        ocr = build_ocr_processor(ocr_config)
+    else:
+        ocr = StubOCR(args.ocr_latency, source.labels)
+
+    if args.translator == "stub":
+        translator: BaseTranslator = StubTranslator(args.translate_latency)
+    else:
+        translator = build_translator(
+            TranslationConfig(
+                engine=args.translator,
+                source_lang=args.source_lang,
+                target_lang=args.target_lang,
+                deepl_api_key=args.deepl_api_key or os.getenv("DEEPL_API_KEY"),
+                cache_enabled=False,
+            )
+        )
+
+    stages: Dict[str, List[float]] = defaultdict(list)
+    stages_lock = threading.Lock()
+
+    def hook(stage: str, seconds: float) -> None:
+        with stages_lock:
+            stages[stage].append(seconds)
+
+    capture = CaptureWorker(CaptureConfig(fps=args.fps), source=source)
+    capture.start()
+    deadline = time.monotonic() + 8.0
+    while capture.latest_seq == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    if capture.latest_seq == 0:
+        capture.stop()
+        raise RuntimeError(f"No frame received from {source.describe()}")
+    assert source.roi is not None
+
+    state = RecordingState()
+    pipeline = PipelineWorker(
+        capture=capture,
+        ocr=ocr,
+        translator=translator,
+        state=state,
+        roi=source.roi,
+        ocr_config=ocr_config,
+        stage_hook=hook,
+    )
+
+    started = time.monotonic()
+    pipeline.start()
+    try:
+        while time.monotonic() - started < args.duration and not capture.finished:
+            time.sleep(0.05)
+    finally:
+        pipeline.stop()
+    elapsed = time.monotonic() - started
+
+    try:
+        ocr_rate = _probe_ocr_rate(ocr, capture, source.roi, args.rate_probe_sec)
+        roi_frame = capture.get_latest_roi(source.roi)
+    finally:
+        capture.stop()
+        ocr.close()
+
+    preprocess_variants: Dict[str, object] = {}
+    if args.preprocess_variants and roi_frame is not None:
+        preprocess_variants = benchmark_preprocess(args.preprocess_variants, roi_frame.image, args)
+
+    similarity: Dict[str, object] = {}
+    if args.similarity_iterations > 0:
+        similarity = benchmark_similarity(args.similarity_iterations)
+
+    latencies, missed = change_to_overlay(list(source.changes), list(state.updates))
+    change_summary: Dict[str, object] = dict(summarize(latencies))
+    change_summary["missed"] = missed
+    latencies, missed = change_to_overlay(list(source.changes), list(state.translations))
+    translation_summary: Dict[str, object] = dict(summarize(latencies))
+    translation_summary["missed"] = missed
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "host": {"platform": platform.platform(), "python": platform.python_version()},
+        "config": {
+            key: value for key, value in sorted(vars(args).items()) if key not in {"deepl_api_key", "output"}
+        },
+        "duration_sec": round(elapsed, 3),
+        "counters": {
+            "frames_captured": capture.latest_seq,
+            "screen_changes": len(source.changes),
+            "ocr_calls": pipeline.ocr_calls,
+            "ocr_skipped": pipeline.ocr_skipped,
+            "ocr_detection_passes": getattr(ocr, "detection_passes", pipeline.ocr_calls),
+            "ocr_recognition_only": getattr(ocr, "recognition_passes", 0),
+            "overlay_updates": len(state.updates),
+            "translations_submitted": pipeline.translation.submitted,
+            "translations_dropped": pipeline.translation.dropped,
+            "translations_stale": pipeline.translation.stale,
+            "translation_max_depth": pipeline.translation.max_depth,
+        },
+        "stages": {name: summarize(values) for name, values in sorted(stages.items())},
+        "ocr_max_rate_hz": round(ocr_rate, 3),
+        "change_to_overlay": change_summary,
+        "change_to_translation": translation_summary,
+        "preprocess_variants": preprocess_variants,
+        "similarity": similarity,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    if argv and argv[0] == "hedge":
+        from .hedge_bench import main as hedge_main
+
+        return hedge_main(argv[1:])
+    if argv and argv[0] == "overlay":
+        from .overlay_bench import main as overlay_main
+
+        return overlay_main(argv[1:])
+    args = _build_parser().parse_args(argv)
+    report = run_benchmark(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(text)
+            fp.write("\n")
+    print(text)
+    similarity = report.get("similarity") or {}
+    if any(case["agreement"] < 1.0 for case in similarity.values()):
+        print("is_similar disagrees with SequenceMatcher")
+        return 1
+    return 0
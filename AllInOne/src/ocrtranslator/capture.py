@@ -1,29 +1,77 @@
 from __future__ import annotations
 
-import platform
 import threading
 import time
-from typing import Optional
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
 
-import cv2
 import numpy as np
 
 from .config import CaptureConfig
+from .roi import Rect, clamp_roi, crop
+from .sources import FrameSource, build_frame_source
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    seq: int
+    timestamp: float
+    image: np.ndarray
 
 
 class CaptureWorker:
-    def __init__(self, config: CaptureConfig) -> None:
+    def __init__(
+        self,
+        config: CaptureConfig,
+        ring_size: int = 3,
+        source: Optional[FrameSource] = None,
+    ) -> None:
         self._config = config
+        self._source = source or build_frame_source(config)
         self._stop_event = threading.Event()
+        self._finished = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._lock = threading.Lock()
-        self._latest_frame: Optional[np.ndarray] = None
-        self._capture: Optional[cv2.VideoCapture] = None
+        self._frame_ready = threading.Condition(self._lock)
+        self._opened = False
+
+        # The writer decodes into slot (seq + 1) % ring_size while readers may
+        # still hold views of the previous slots, so three buffers is the minimum.
+        self._ring_size = max(3, ring_size)
+        self._ring: List[np.ndarray] = []
+        self._seq = 0
+        self._timestamp = 0.0
+        self._read_seq = 0
+        self._frame_at = 0.0
+        # Set by a reader waiting for a new frame; the grab loop then decodes
+        # the next frame it takes.
+        self._wanted = False
+
+        self._on_demand = config.decode == "on_demand" and self._source.supports_grab
+        self._decode_period = 1.0 / config.decode_fps if config.decode_fps > 0 else 0.0
+
+        self.frames_captured = 0
+        # Published frames replaced by a newer one before anything read them.
+        self.frames_dropped = 0
+        self.read_failures = 0
+        # Grabbed from the source but never decoded because nobody wanted them.
+        self.frames_skipped = 0
+        self.fps = 0.0
+        # Startup: time spent in source.open(), and from then until the
+        # source delivered its first frame (drivers often start streaming
+        # only on the first read).
+        self.open_sec = 0.0
+        self.stream_start_sec = 0.0
+        self._opened_at = 0.0
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
             return
-        self._capture = self._open_capture()
+        started = time.perf_counter()
+        self._source.open()
+        self._opened_at = time.perf_counter()
+        self.open_sec = self._opened_at - started
+        self._opened = True
         self._thread = threading.Thread(target=self._run, name="capture-worker", daemon=True)
         self._thread.start()
 
@@ -31,39 +79,181 @@ class CaptureWorker:
         self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=2.0)
-        if self._capture:
-            self._capture.release()
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        if self._opened:
+            self._source.release()
+            self._opened = False
+
+    @property
+    def source(self) -> FrameSource:
+        return self._source
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    @property
+    def on_demand(self) -> bool:
+        return self._on_demand
+
+    @property
+    def latest_seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+    def wait_for_frame(self, since_seq: int = 0, timeout: Optional[float] = None) -> int:
+        # Blocks until a frame newer than since_seq is published, the source
+        # runs out or the timeout passes; returns the latest seq either way.
+        with self._frame_ready:
+            if self._seq <= since_seq:
+                self._wanted = True
+            self._frame_ready.wait_for(
+                lambda: self._seq > since_seq or self._finished.is_set() or self._stop_event.is_set(),
+                timeout=timeout,
+            )
+            return self._seq
 
     def get_latest_frame(self) -> Optional[np.ndarray]:
         with self._lock:
-            if self._latest_frame is None:
+            if self._seq == 0:
                 return None
-            return self._latest_frame.copy()
-
-    def _open_capture(self) -> cv2.VideoCapture:
-        backend = cv2.CAP_DSHOW if platform.system() == "Windows" else 0
-        cap = cv2.VideoCapture(self._config.device_index, backend)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self._config.width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self._config.height)
-        cap.set(cv2.CAP_PROP_FPS, self._config.fps)
-
-        if not cap.isOpened():
-            raise RuntimeError(
-                f"Failed to open video capture device index={self._config.device_index}."
-            )
-        return cap
+            self._read_seq = self._seq
+            return self._slot(self._seq).copy()
+
+    def get_latest_roi(self, roi: Rect, since_seq: int = 0) -> Optional[CapturedFrame]:
+        frames = self.get_latest_rois([roi], since_seq=since_seq)
+        return frames[0] if frames else None
+
+    def get_latest_rois(self, rois: Sequence[Rect], since_seq: int = 0) -> Optional[List[CapturedFrame]]:
+        # All crops come from the same frame, taken under a single lock.
+        with self._lock:
+            if self._seq == 0 or self._seq <= since_seq:
+                return None
+            frame = self._slot(self._seq)
+            self._read_seq = self._seq
+            return [
+                CapturedFrame(
+                    seq=self._seq,
+                    timestamp=self._timestamp,
+                    image=crop(frame, clamp_roi(roi, frame)).copy(),
+                )
+                for roi in rois
+            ]
+
+    def get_latest_view(self, since_seq: int = 0) -> Optional[CapturedFrame]:
+        # Zero-copy access: the pixels are only guaranteed intact while
+        # is_view_valid(seq) holds, so check it again after using them.
+        with self._lock:
+            if self._seq == 0 or self._seq <= since_seq:
+                return None
+            self._read_seq = self._seq
+            view = self._slot(self._seq).view()
+            view.flags.writeable = False
+            return CapturedFrame(seq=self._seq, timestamp=self._timestamp, image=view)
+
+    def is_view_valid(self, seq: int) -> bool:
+        with self._lock:
+            return seq > 0 and self._seq - seq < self._ring_size - 1
+
+    def _slot(self, seq: int) -> np.ndarray:
+        return self._ring[seq % self._ring_size]
 
     def _run(self) -> None:
-        assert self._capture is not None
-        sleep_time = 1.0 / max(float(self._config.fps), 1.0)
+        if self._on_demand:
+            self._run_on_demand()
+        else:
+            self._run_every()
+
+        with self._frame_ready:
+            self._finished.set()
+            self._frame_ready.notify_all()
+
+    def _run_every(self) -> None:
+        while not self._stop_event.is_set():
+            next_seq = self._seq + 1
+            target = self._ring[next_seq % self._ring_size] if self._ring else None
+            ok, frame = self._source.read(target)
+            if not ok or frame is None:
+                if self._source.exhausted:
+                    break
+                self.read_failures += 1
+                time.sleep(0.01)
+                continue
 
+            self._store(next_seq, frame, target)
+
+    def _run_on_demand(self) -> None:
+        # Grabbing keeps the device queue drained so the frame that does get
+        # decoded is current; decoding and color conversion, the expensive
+        # part, happen only for frames a reader will look at.
         while not self._stop_event.is_set():
-            ok, frame = self._capture.read()
-            if not ok:
+            if not self._source.grab():
+                if self._source.exhausted:
+                    break
+                self.read_failures += 1
                 time.sleep(0.01)
                 continue
 
             with self._lock:
-                self._latest_frame = frame
+                now = time.monotonic()
+                due = (
+                    self._seq == 0
+                    or self._wanted
+                    or (self._decode_period > 0.0 and now - self._timestamp >= self._decode_period)
+                )
+                if not due:
+                    self._tick(now)
+                    self.frames_skipped += 1
+                    continue
+                self._wanted = False
+
+            next_seq = self._seq + 1
+            target = self._ring[next_seq % self._ring_size] if self._ring else None
+            ok, frame = self._source.retrieve(target)
+            if not ok or frame is None:
+                self.read_failures += 1
+                with self._lock:
+                    self._wanted = True
+                continue
+            self._store(next_seq, frame, target)
+
+    def _store(self, seq: int, frame: np.ndarray, target: Optional[np.ndarray]) -> None:
+        if frame is target:
+            self._publish(seq)
+        else:
+            self._store_reallocated(seq, frame)
+
+    def _tick(self, now: float) -> None:
+        # Called under the lock for every frame the source delivers.
+        if self._frame_at == 0.0:
+            self.stream_start_sec = time.perf_counter() - self._opened_at
+        if self._frame_at > 0.0 and now > self._frame_at:
+            self.fps += 0.1 * (1.0 / (now - self._frame_at) - self.fps)
+        self._frame_at = now
+
+    def _publish(self, seq: int, ring: Optional[List[np.ndarray]] = None) -> None:
+        with self._lock:
+            if ring is not None:
+                self._ring = ring
+            now = time.monotonic()
+            if self._seq > self._read_seq:
+                self.frames_dropped += 1
+            self._tick(now)
+            self.frames_captured += 1
+            self._seq = seq
+            self._timestamp = now
+            self._frame_ready.notify_all()
+
+    def _store_reallocated(self, seq: int, frame: np.ndarray) -> None:
+        # First frame, a resolution change or a backend that ignores the output
+        # buffer. Rebuild the ring only when the shape changed; old views keep
+        # their arrays alive.
+        if self._ring and self._ring[0].shape == frame.shape and self._ring[0].dtype == frame.dtype:
+            np.copyto(self._ring[seq % self._ring_size], frame)
+            self._publish(seq)
+            return
 
-            time.sleep(sleep_time * 0.2)
+        ring = [np.empty_like(frame) for _ in range(self._ring_size)]
+        np.copyto(ring[seq % self._ring_size], frame)
+        self._publish(seq, ring)
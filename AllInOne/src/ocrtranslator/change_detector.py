@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class FrameChangeDetector:
+    pixel_delta: int = 24
+    min_changed_ratio: float = 0.0005
+    downsample: int = 4
+
+    def __post_init__(self) -> None:
+        self._reference: Optional[np.ndarray] = None
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def has_changed(self, frame: np.ndarray) -> bool:
+        self.frames_checked += 1
+        thumb = self._thumbnail(frame)
+
+        if self._reference is None or self._reference.shape != thumb.shape:
+            self._reference = thumb
+            return True
+
+        diff = cv2.absdiff(thumb, self._reference)
+        changed = int(np.count_nonzero(diff > self.pixel_delta))
+        if changed < max(1, int(diff.size * self.min_changed_ratio)):
+            self.frames_skipped += 1
+            return False
+
+        self._reference = thumb
+        return True
+
+    def reset(self) -> None:
+        self._reference = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.downsample <= 1:
+            return frame.copy()
+
+        h, w = frame.shape[:2]
+        size = (max(1, w // self.downsample), max(1, h // self.downsample))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
@@ -13,6 +13,17 @@ class CaptureConfig:
     width: int = 1280
     height: int = 720
     fps: int = 30
+    source: str = "device"
+    source_path: Optional[str] = None
+    realtime: bool = True
+    loop: bool = False
+    # "on_demand" grabs every frame but decodes only when the pipeline asks
+    # for one (or at decode_fps); "every" decodes all of them. Sources that
+    # cannot grab (including files read with realtime=False) always decode
+    # every frame.
+    decode: str = "on_demand"
+    decode_fps: float = 0.0
+    fourcc: Optional[str] = None
 
 
 @dataclass(frozen=True)
@@ -22,6 +33,24 @@ class OCRConfig:
     pre_scale: float = 2.0
     threshold: int = 170
     min_confidence: float = 0.45
+    preprocess: Tuple[str, ...] = ("gray", "upscale", "threshold", "median")
+    interpolation: str = "cubic"
+    adaptive_block_size: int = 31
+    adaptive_c: float = 10.0
+    change_gate: bool = True
+    change_pixel_delta: int = 24
+    change_min_ratio: float = 0.0005
+    typewriter_settle_sec: float = 0.0
+    typewriter_preview: bool = False
+    det_cache: bool = False
+    det_refresh_sec: float = 3.0
+    det_min_score: float = 0.8
+    det_layout_ratio: float = 0.001
+    processes: int = 0
+    scheduler: str = "adaptive"
+    min_rate_hz: float = 3.0
+    max_rate_hz: float = 10.0
+    burst_sec: float = 1.5
 
 
 @dataclass(frozen=True)
@@ -30,6 +59,26 @@ class TranslationConfig:
     source_lang: str = "ja"
     target_lang: str = "ko"
     deepl_api_key: Optional[str] = None
+    deepl_url: Optional[str] = None
+    request_timeout_sec: float = 8.0
+    max_retries: int = 2
+    queue_size: int = 4
+    cache_enabled: bool = True
+    # None keeps the cache in memory only.
+    cache_path: Optional[str] = None
+    cache_memory_entries: int = 2048
+    cache_disk_entries: int = 100_000
+    cache_ttl_sec: float = 30 * 86400.0
+    memory_enabled: bool = True
+    memory_min_similarity: float = 0.9
+    memory_budget_ms: float = 2.0
+    memory_max_entries: int = 50_000
+    memory_seed_dir: Optional[str] = None
+    hedge_engine: Optional[str] = None
+    hedge_delay_sec: float = 0.6
+    hedge_adaptive: bool = True
+    hedge_min_delay_sec: float = 0.1
+    hedge_max_delay_sec: float = 2.0
 
 
 @dataclass(frozen=True)
@@ -40,6 +89,8 @@ class OverlayConfig:
     font_size: int = 28
     show_source: bool = False
     click_through: bool = True
+    # What a line shows while its translation is pending: "source" or "marker".
+    pending_display: str = "source"
 
 
 @dataclass(frozen=True)
@@ -47,6 +98,26 @@ class LogConfig:
     enabled: bool = True
     directory: str = "logs"
     source_only: bool = False
+    flush_interval_sec: float = 1.0
+    fsync: bool = False
+    rotate_mb: float = 32.0
+    compress_rotated: bool = True
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    enabled: bool = True
+    host: str = "127.0.0.1"
+    port: int = 0
+    snapshot_path: Optional[str] = None
+    snapshot_interval_sec: float = 10.0
+
+
+@dataclass(frozen=True)
+class RegionConfig:
+    name: str
+    rect: Rect
+    threshold: Optional[int] = None
 
 
 @dataclass(frozen=True)
@@ -57,3 +128,5 @@ class AppConfig:
     overlay: OverlayConfig
     log: LogConfig
     roi: Optional[Rect] = None
+    regions: Tuple[RegionConfig, ...] = ()
+    metrics: MetricsConfig = MetricsConfig()
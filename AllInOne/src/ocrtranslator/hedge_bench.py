@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from .bench import summarize
+from .hedging import HedgedTranslator
+from .translator import BaseTranslator, DeepLTranslator
+
+DelayFn = Callable[[], float]
+
+
+class StandInServer:
+    # DeepL-compatible /v2/translate endpoint on localhost that sleeps for
+    # delay() before answering "[name] <text>" for each text.
+    def __init__(self, name: str, delay: DelayFn) -> None:
+        self.name = name
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                texts = parse_qs(self.rfile.read(length).decode("utf-8")).get("text", [])
+                server.requests += 1
+                time.sleep(delay())
+                body = json.dumps({"translations": [{"text": f"[{server.name}] {text}"} for text in texts]})
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args) -> None:
+                return
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f"stand-in-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v2/translate"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def delay_profile(
+    rng: random.Random,
+    base_ms: float,
+    jitter_ms: float,
+    tail_ratio: float = 0.0,
+    tail_ms: float = 0.0,
+) -> DelayFn:
+    # Mostly base +- jitter, with a tail_ratio share of requests stalling.
+    lock = threading.Lock()
+
+    def delay() -> float:
+        with lock:
+            stalled = rng.random() < tail_ratio
+            jitter = rng.uniform(-jitter_ms, jitter_ms)
+        return max(0.0, (tail_ms if stalled else base_ms + jitter) / 1000.0)
+
+    return delay
+
+
+def _translator(server: StandInServer, timeout_sec: float) -> DeepLTranslator:
+    return DeepLTranslator(api_key="stand-in", source_lang="ja", target_lang="ko", url=server.url, timeout_sec=timeout_sec, max_retries=0)
+
+
+def _measure(translator: BaseTranslator, requests: int) -> List[float]:
+    latencies: List[float] = []
+    for index in range(requests):
+        started = time.perf_counter()
+        translator.translate(f"line {index}")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_hedge_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    # Both runs see the same seeded primary delays, so the only difference
+    # is the hedge.
+    def primary_delay() -> DelayFn:
+        return delay_profile(random.Random(args.seed), args.primary_ms, args.primary_jitter_ms, args.tail_ratio, args.tail_ms)
+
+    secondary_delay = delay_profile(random.Random(args.seed + 1), args.secondary_ms, args.secondary_jitter_ms)
+    timeout_sec = max(5.0, args.tail_ms / 1000.0 * 2)
+
+    primary = StandInServer("primary", primary_delay())
+    try:
+        single = _translator(primary, timeout_sec)
+        baseline = _measure(single, args.requests)
+        single.close()
+    finally:
+        primary.close()
+
+    primary = StandInServer("primary", primary_delay())
+    secondary = StandInServer("secondary", secondary_delay)
+    try:
+        hedged = HedgedTranslator(
+            _translator(primary, timeout_sec),
+            _translator(secondary, timeout_sec),
+            primary_name="primary",
+            secondary_name="secondary",
+            delay_sec=args.hedge_delay_ms / 1000.0,
+            adaptive=not args.hedge_fixed_delay,
+            max_delay_sec=args.hedge_max_delay_ms / 1000.0,
+        )
+        with_hedge = _measure(hedged, args.requests)
+        engines = {
+            engine.name: {"requests": engine.requests, "wins": engine.wins, "failures": engine.failures}
+            for engine in hedged.engines
+        }
+        report_hedge = {
+            "latency": summarize(with_hedge),
+            "hedged": hedged.hedged,
+            "final_delay_ms": round(hedged.hedge_delay * 1000.0, 3),
+            "engines": engines,
+            "extra_request_ratio": round(hedged.hedged / max(1, args.requests), 4),
+        }
+        hedged.close()
+    finally:
+        primary.close()
+        secondary.close()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in sorted(vars(args).items()) if key != "output"},
+        "primary_only": {"latency": summarize(baseline)},
+        "hedged": report_hedge,
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py bench hedge",
+        description="Measure hedged translation against local stand-in servers with injected delays",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--primary-ms", type=float, default=40.0)
+    parser.add_argument("--primary-jitter-ms", type=float, default=15.0)
+    parser.add_argument("--tail-ratio", type=float, default=0.04, help="Share of primary requests that stall")
+    parser.add_argument("--tail-ms", type=float, default=1500.0, help="Primary stall length")
+    parser.add_argument("--secondary-ms", type=float, default=80.0)
+    parser.add_argument("--secondary-jitter-ms", type=float, default=15.0)
+    parser.add_argument("--hedge-delay-ms", type=float, default=600.0)
+    parser.add_argument("--hedge-max-delay-ms", type=float, default=2000.0)
+    parser.add_argument("--hedge-fixed-delay", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here as well")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    report = run_hedge_benchmark(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(text)
+            fp.write("\n")
+    print(text)
+    return 0
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+from .translator import BaseTranslator, IdentityTranslator, TranslationError
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200) -> None:
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=max(1, size))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+        return samples[index]
+
+
+@dataclass
+class EngineStats:
+    name: str
+    requests: int = 0
+    wins: int = 0
+    failures: int = 0
+    latency: LatencyWindow = field(default_factory=LatencyWindow)
+
+
+class HedgedTranslator(BaseTranslator):
+    def __init__(
+        self,
+        primary: BaseTranslator,
+        secondary: BaseTranslator,
+        primary_name: str = "primary",
+        secondary_name: str = "secondary",
+        delay_sec: float = 0.6,
+        adaptive: bool = True,
+        quantile: float = 0.95,
+        min_delay_sec: float = 0.1,
+        max_delay_sec: float = 2.0,
+        min_samples: int = 20,
+        max_workers: int = 8,
+    ) -> None:
+        self._primary = primary
+        self._secondary = secondary
+        self._delay_sec = delay_sec
+        self._adaptive = adaptive
+        self._quantile = quantile
+        self._min_delay_sec = min_delay_sec
+        self._max_delay_sec = max(min_delay_sec, max_delay_sec)
+        self._min_samples = max(1, min_samples)
+        # A stalled request keeps its worker until the engine's own timeout,
+        # so the pool has room for a few of them next to fresh requests.
+        self._executor = ThreadPoolExecutor(max_workers=max(2, max_workers), thread_name_prefix="translate-hedge")
+        self.primary_stats = EngineStats(primary_name)
+        self.secondary_stats = EngineStats(secondary_name)
+        self.hedged = 0
+        self._answered = threading.local()
+
+    @property
+    def inner(self) -> BaseTranslator:
+        return self._primary
+
+    @property
+    def engines(self) -> List[EngineStats]:
+        return [self.primary_stats, self.secondary_stats]
+
+    @property
+    def answered_by(self) -> Optional[str]:
+        # Engine whose answer the last call on this thread returned, so
+        # layers above can store it under that engine's name.
+        return getattr(self._answered, "engine", None)
+
+    @property
+    def hedge_delay(self) -> float:
+        # Hedging at the primary's recent p95 sends a second request for
+        # roughly one line in twenty, the slow ones.
+        if not self._adaptive or len(self.primary_stats.latency) < self._min_samples:
+            return self._delay_sec
+        recent = self.primary_stats.latency.quantile(self._quantile)
+        if recent is None:
+            return self._delay_sec
+        return min(self._max_delay_sec, max(self._min_delay_sec, recent))
+
+    def translate_strict(self, text: str) -> str:
+        return self._race(
+            lambda: self._primary.translate_strict(text),
+            lambda: self._secondary.translate_strict(text),
+        )
+
+    def translate_many_strict(self, texts: Sequence[str]) -> List[str]:
+        return self._race(
+            lambda: self._primary.translate_many_strict(texts),
+            lambda: self._secondary.translate_many_strict(texts),
+        )
+
+    def warm_up(self) -> None:
+        self._primary.warm_up()
+        self._secondary.warm_up()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._primary.close()
+        self._secondary.close()
+
+    def _race(self, primary_call: Callable[[], T], secondary_call: Callable[[], T]) -> T:
+        self._answered.engine = None
+        primary = self._submit(primary_call, self.primary_stats)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done and primary.exception() is None:
+            self.primary_stats.wins += 1
+            self._answered.engine = self.primary_stats.name
+            return primary.result()
+
+        # The primary is slow or already failed: ask the secondary as well
+        # and take whichever answers first. The loser is left to finish in
+        # the background so its latency still feeds the window.
+        self.hedged += 1
+        secondary = self._submit(secondary_call, self.secondary_stats)
+        owners: Dict[Future, EngineStats] = {primary: self.primary_stats, secondary: self.secondary_stats}
+        pending = set(owners)
+        errors: List[str] = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                exc = future.exception()
+                if exc is not None:
+                    errors.append(f"{owners[future].name}: {exc}")
+                    continue
+                if future is secondary and isinstance(self._secondary, IdentityTranslator):
+                    # An identity hedge means "stop waiting and show the
+                    # source"; raising keeps that text out of the cache.
+                    raise TranslationError(f"{self.primary_stats.name} did not answer within {self.hedge_delay:.2f}s")
+                owners[future].wins += 1
+                self._answered.engine = owners[future].name
+                return future.result()
+        raise TranslationError("; ".join(errors))
+
+    def _submit(self, call: Callable[[], T], stats: EngineStats) -> "Future[T]":
+        stats.requests += 1
+
+        def timed() -> T:
+            start = time.perf_counter()
+            try:
+                result = call()
+            except Exception:
+                stats.failures += 1
+                raise
+            stats.latency.add(time.perf_counter() - start)
+            return result
+
+        return self._executor.submit(timed)
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import gzip
 import json
+import os
+import queue
+import shutil
 import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime
-from difflib import SequenceMatcher
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .similarity import is_similar, normalize_text
 
 
 @dataclass(frozen=True)
@@ -16,6 +22,22 @@ class LogEntry:
     timestamp: str
     source_text: str
     translated_text: str
+    region: Optional[str] = None
+    media_time: Optional[float] = None
+
+
+def format_media_time(seconds: float) -> str:
+    millis = int(round(max(0.0, seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    return f"{hours:02d}:{minutes:02d}:{millis // 1000:02d}.{millis % 1000:03d}"
+
+
+@dataclass
+class _WindowTrack:
+    window_id: int = 0
+    last_text: str = ""
+    last_event_mono: float = 0.0
 
 
 class TranscriptLogger:
@@ -27,6 +49,12 @@ class TranscriptLogger:
         source_only: bool = False,
         window_merge_sec: float = 1.6,
         same_window_similarity: float = 0.72,
+        flush_interval_sec: float = 1.0,
+        flush_entries: int = 32,
+        fsync: bool = False,
+        rotate_bytes: int = 32 * 1024 * 1024,
+        compress_rotated: bool = True,
+        queue_size: int = 1024,
     ) -> None:
         self._source_lang = source_lang
         self._target_lang = target_lang
@@ -37,8 +65,10 @@ class TranscriptLogger:
         self._lock = threading.Lock()
         self._entry_id = 0
         self._window_id = 0
-        self._last_text = ""
-        self._last_event_mono = 0.0
+        self._last_written_window = 0
+        # Window grouping is tracked per region so name plates and dialogue
+        # boxes updating together do not split each other's windows.
+        self._tracks: Dict[Optional[str], _WindowTrack] = {}
 
         started_at = datetime.now()
         session_name = f"session_{started_at:%Y%m%d_%H%M%S}"
@@ -48,68 +78,102 @@ class TranscriptLogger:
         self.text_log_path = self.session_dir / "transcript.txt"
         self.jsonl_log_path = self.session_dir / "transcript.jsonl"
 
-        self._write_text_header(started_at)
+        self._text_header = self._format_text_header(started_at)
+        self._writer = TranscriptWriter(
+            files=[self.jsonl_log_path, self.text_log_path],
+            headers=[b"", self._text_header],
+            flush_interval_sec=flush_interval_sec,
+            flush_entries=flush_entries,
+            fsync=fsync,
+            rotate_bytes=rotate_bytes,
+            compress_rotated=compress_rotated,
+            queue_size=queue_size,
+        )
+
+    @property
+    def writer(self) -> "TranscriptWriter":
+        return self._writer
 
-    def log(self, source_text: str, translated_text: str) -> LogEntry:
+    def log(
+        self,
+        source_text: str,
+        translated_text: str,
+        region: Optional[str] = None,
+        media_time: Optional[float] = None,
+    ) -> LogEntry:
+        # media_time (seconds into a recording) replaces the wall clock for
+        # both the entry timestamp and window grouping.
         source_text = source_text.strip()
         translated_text = translated_text.strip()
         if not source_text:
             raise ValueError("Cannot log empty source text")
 
         with self._lock:
-            now_dt = datetime.now()
-            now_mono = time.monotonic()
-            is_new_window = self._is_new_window(source_text, now_mono)
-            if is_new_window:
+            if media_time is None:
+                now_mono = time.monotonic()
+                timestamp = datetime.now().isoformat(timespec="seconds")
+            else:
+                now_mono = media_time
+                timestamp = format_media_time(media_time)
+            track = self._tracks.setdefault(region, _WindowTrack())
+            if self._is_new_window(track, source_text, now_mono):
                 self._window_id += 1
+                track.window_id = self._window_id
 
             self._entry_id += 1
             entry = LogEntry(
                 entry_id=self._entry_id,
-                window_id=self._window_id,
-                timestamp=now_dt.isoformat(timespec="seconds"),
+                window_id=track.window_id,
+                timestamp=timestamp,
                 source_text=source_text,
                 translated_text=translated_text,
+                region=region,
+                media_time=media_time,
             )
 
-            self._append_jsonl(entry)
-            self._append_text(entry, is_new_window)
+            show_window_header = entry.window_id != self._last_written_window
+            # Formatting and disk I/O happen on the writer thread.
+            self._writer.submit((entry, show_window_header), self._format_entry)
 
-            self._last_text = source_text
-            self._last_event_mono = now_mono
+            self._last_written_window = entry.window_id
+            track.last_text = source_text
+            track.last_event_mono = now_mono
             return entry
 
     def close(self) -> None:
-        return
+        self._writer.close()
 
-    def _is_new_window(self, text: str, now_mono: float) -> bool:
-        if not self._last_text:
+    def _is_new_window(self, track: _WindowTrack, text: str, now_mono: float) -> bool:
+        if not track.last_text:
             return True
 
-        elapsed = now_mono - self._last_event_mono
+        elapsed = now_mono - track.last_event_mono
         if elapsed > self._window_merge_sec:
             return True
 
-        prev = self._last_text
+        prev = normalize_text(track.last_text)
+        text = normalize_text(text)
         if text in prev or prev in text:
             return False
 
-        similarity = SequenceMatcher(None, prev, text).ratio()
-        if similarity >= self._same_window_similarity:
-            return False
+        return not is_similar(prev, text, self._same_window_similarity)
 
-        return True
+    def _format_text_header(self, started_at: datetime) -> bytes:
+        lines = [
+            "OCR Translator Transcript\n",
+            f"Started At: {started_at.isoformat(timespec='seconds')}\n",
+            f"Source Lang: {self._source_lang}\n",
+            f"Target Lang: {self._target_lang}\n",
+            "=" * 72,
+            "\n",
+        ]
+        return "".join(lines).encode("utf-8")
 
-    def _write_text_header(self, started_at: datetime) -> None:
-        with self.text_log_path.open("a", encoding="utf-8") as fp:
-            fp.write("OCR Translator Transcript\n")
-            fp.write(f"Started At: {started_at.isoformat(timespec='seconds')}\n")
-            fp.write(f"Source Lang: {self._source_lang}\n")
-            fp.write(f"Target Lang: {self._target_lang}\n")
-            fp.write("=" * 72)
-            fp.write("\n")
+    def _format_entry(self, item: Tuple[LogEntry, bool]) -> List[bytes]:
+        entry, show_window_header = item
+        return [self._format_jsonl(entry), self._format_text(entry, show_window_header)]
 
-    def _append_jsonl(self, entry: LogEntry) -> None:
+    def _format_jsonl(self, entry: LogEntry) -> bytes:
         payload = {
             "entry_id": entry.entry_id,
             "window_id": entry.window_id,
@@ -119,21 +183,167 @@ class TranscriptLogger:
             "source_text": entry.source_text,
             "translated_text": entry.translated_text,
         }
+        if entry.region is not None:
+            payload["region"] = entry.region
+        if entry.media_time is not None:
+            payload["media_time"] = round(entry.media_time, 3)
+        return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _format_text(self, entry: LogEntry, show_window_header: bool) -> bytes:
+        parts = []
+        if show_window_header:
+            parts.append("\n")
+            parts.append("-" * 72)
+            parts.append("\n")
+            parts.append(f"[WINDOW {entry.window_id:04d}]\n")
+
+        region = f" [{entry.region}]" if entry.region is not None else ""
+        parts.append(f"[ENTRY {entry.entry_id:05d}] {entry.timestamp}{region}\n")
+        parts.append(f"SRC({self._source_lang}): {entry.source_text}\n")
+        if not self._source_only:
+            parts.append(f"TRN({self._target_lang}): {entry.translated_text}\n")
+        parts.append("\n")
+        return "".join(parts).encode("utf-8")
+
+
+_CLOSE = object()
+
+
+class TranscriptWriter:
+    def __init__(
+        self,
+        files: Sequence[Path],
+        headers: Sequence[bytes],
+        flush_interval_sec: float = 1.0,
+        flush_entries: int = 32,
+        fsync: bool = False,
+        rotate_bytes: int = 0,
+        compress_rotated: bool = True,
+        queue_size: int = 1024,
+    ) -> None:
+        self._paths = list(files)
+        self._headers = list(headers)
+        self._flush_interval_sec = flush_interval_sec
+        self._flush_entries = max(1, flush_entries)
+        self._fsync = fsync
+        self._rotate_bytes = rotate_bytes
+        self._compress_rotated = compress_rotated
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._part = 0
+
+        self._handles: List[BinaryIO] = []
+        self._sizes: List[int] = []
+        self._open_files()
+
+        self.written = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.stalls = 0
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="transcript-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, item: Any, formatter: Callable[[Any], List[bytes]]) -> None:
+        if self._closed:
+            raise RuntimeError("Transcript writer is closed")
+        try:
+            self._queue.put_nowait((item, formatter))
+        except queue.Full:
+            # Only a disk that cannot keep up gets here; wait rather than
+            # lose transcript lines.
+            self.stalls += 1
+            self._queue.put((item, formatter))
+
+    def close(self, timeout: float = 10.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        pending = 0
+        next_flush = time.monotonic() + self._flush_interval_sec
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _CLOSE:
+                    break
+
+                if item is not None:
+                    self._write(*item)
+                    pending += 1
+                if pending and (pending >= self._flush_entries or time.monotonic() >= next_flush):
+                    self._flush(sync=self._fsync)
+                    pending = 0
+                if time.monotonic() >= next_flush:
+                    next_flush = time.monotonic() + self._flush_interval_sec
+        finally:
+            self._flush(sync=True)
+            for handle in self._handles:
+                handle.close()
+
+    def _write(self, item: Any, formatter: Callable[[Any], List[bytes]]) -> None:
+        try:
+            chunks = formatter(item)
+            if self._rotate_bytes > 0 and any(
+                size > len(header) and size + len(chunk) > self._rotate_bytes
+                for size, chunk, header in zip(self._sizes, chunks, self._headers)
+            ):
+                self._rotate()
+            for index, chunk in enumerate(chunks):
+                self._handles[index].write(chunk)
+                self._sizes[index] += len(chunk)
+            self.written += 1
+        except Exception as exc:
+            self.errors += 1
+            print(f"Log write failed: {exc}")
+
+    def _flush(self, sync: bool) -> None:
+        try:
+            for handle in self._handles:
+                handle.flush()
+                if sync:
+                    os.fsync(handle.fileno())
+            self.flushes += 1
+        except Exception as exc:
+            self.errors += 1
+            print(f"Log flush failed: {exc}")
+
+    def _open_files(self) -> None:
+        self._handles = []
+        self._sizes = []
+        for path, header in zip(self._paths, self._headers):
+            handle = path.open("ab")
+            size = handle.tell()
+            if size == 0 and header:
+                handle.write(header)
+                size = len(header)
+            self._handles.append(handle)
+            self._sizes.append(size)
+
+    def _rotate(self) -> None:
+        # All files roll over together so part N of the text and JSONL
+        # transcripts cover the same entries.
+        self._flush(sync=self._fsync)
+        for handle in self._handles:
+            handle.close()
 
-        with self.jsonl_log_path.open("a", encoding="utf-8") as fp:
-            fp.write(json.dumps(payload, ensure_ascii=False))
-            fp.write("\n")
-
-    def _append_text(self, entry: LogEntry, is_new_window: bool) -> None:
-        with self.text_log_path.open("a", encoding="utf-8") as fp:
-            if is_new_window:
-                fp.write("\n")
-                fp.write("-" * 72)
-                fp.write("\n")
-                fp.write(f"[WINDOW {entry.window_id:04d}]\n")
-
-            fp.write(f"[ENTRY {entry.entry_id:05d}] {entry.timestamp}\n")
-            fp.write(f"SRC({self._source_lang}): {entry.source_text}\n")
-            if not self._source_only:
-                fp.write(f"TRN({self._target_lang}): {entry.translated_text}\n")
-            fp.write("\n")
+        self._part += 1
+        for path in self._paths:
+            rotated = path.with_name(f"{path.stem}.{self._part:04d}{path.suffix}")
+            path.replace(rotated)
+            if self._compress_rotated:
+                with rotated.open("rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                rotated.unlink()
+        self.rotations += 1
+        self._open_files()
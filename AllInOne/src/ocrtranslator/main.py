@@ -1,74 +1,314 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import os
+import sys
+import threading
 import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
-from .config import AppConfig, CaptureConfig, LogConfig, OCRConfig, OverlayConfig, TranslationConfig
+from .config import AppConfig, CaptureConfig, LogConfig, MetricsConfig, OCRConfig, OverlayConfig, TranslationConfig
 from .logger import TranscriptLogger
+from .preprocess import parse_steps
 
 
 def _wait_for_first_frame(capture, timeout_sec: float = 8.0):
-    end = time.monotonic() + timeout_sec
-    while time.monotonic() < end:
-        frame = capture.get_latest_frame()
-        if frame is not None:
-            return frame
-        time.sleep(0.05)
-    return None
+    capture.wait_for_frame(0, timeout=timeout_sec)
+    return capture.get_latest_frame()
+
+
+class _BackgroundTask:
+    # Runs one startup step on a daemon thread so a slow model load never
+    # keeps the process alive after startup fails elsewhere.
+    def __init__(self, name: str, target: Callable[[], Any]) -> None:
+        self._target = target
+        self._lock = threading.Lock()
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+        self._discarded = False
+        self.seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def result(self) -> Any:
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def discard(self) -> None:
+        # Closes the result now if it is ready, or as soon as it is.
+        with self._lock:
+            self._discarded = True
+            result = self._result
+        if result is not None:
+            result.close()
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            result = self._target()
+        except BaseException as exc:
+            self._error = exc
+            return
+        finally:
+            self.seconds = time.perf_counter() - started
+        with self._lock:
+            self._result = result
+            discarded = self._discarded
+        if discarded:
+            result.close()
+
+
+def _prepare_translator(config: TranslationConfig):
+    from .translator import build_translator
+
+    translator = build_translator(config)
+    translator.warm_up()
+    return translator
+
+
+def _print_startup(timings: Dict[str, float]) -> None:
+    print("Startup", *(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+
+
+def _print_cache_stats(translator) -> None:
+    from .translator import find_layer
+
+    layer = find_layer(translator, "cache")
+    cache = layer.cache if layer is not None else None
+    if cache is not None:
+        stats = cache.stats
+        print(
+            "Translation cache",
+            f"memory_hits={stats.memory_hits}",
+            f"disk_hits={stats.disk_hits}",
+            f"misses={stats.misses}",
+            f"hit_ratio={stats.hit_ratio:.2f}",
+        )
+
+    layer = find_layer(translator, "memory")
+    memory = layer.memory if layer is not None else None
+    if memory is not None:
+        stats = memory.stats
+        print(
+            "Translation memory",
+            f"entries={len(memory)}",
+            f"seeded={stats.seeded}",
+            f"exact_hits={stats.exact_hits}",
+            f"fuzzy_hits={stats.fuzzy_hits}",
+            f"misses={stats.misses}",
+            f"over_budget={stats.over_budget}",
+        )
+
+    hedged = find_layer(translator, "hedged")
+    if hedged is not None:
+        print(
+            "Translation hedging",
+            f"hedged={hedged.hedged}",
+            f"delay={hedged.hedge_delay * 1000:.0f}ms",
+            *(
+                f"{engine.name}=wins:{engine.wins}/requests:{engine.requests}/failures:{engine.failures}"
+                for engine in hedged.engines
+            ),
+        )
 
 
 def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Capture-card OCR translator overlay")
 
     parser.add_argument("--device", type=int, default=0, help="Video capture device index")
+    parser.add_argument(
+        "--source",
+        type=str,
+        default="device",
+        choices=["device", "video", "images", "synthetic"],
+        help="Frame source (capture device, video file, PNG directory or synthetic text)",
+    )
+    parser.add_argument("--source-path", type=str, default=None, help="Video file, frame directory or synthetic text file")
+    parser.add_argument("--fast", action="store_true", help="Read file sources as fast as possible instead of real time")
+    parser.add_argument("--loop", action="store_true", help="Restart file and synthetic sources at the end")
     parser.add_argument("--width", type=int, default=1280)
     parser.add_argument("--height", type=int, default=720)
     parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument(
+        "--capture-decode",
+        type=str,
+        default="on-demand",
+        choices=["on-demand", "every"],
+        help="Decode only the frames the pipeline reads (grab/retrieve) or every captured frame; --fast file playback always decodes every frame",
+    )
+    parser.add_argument("--decode-fps", type=float, default=0.0, help="Also decode at this rate in on-demand mode")
+    parser.add_argument("--fourcc", type=str, default=None, help="Capture pixel format to request, e.g. MJPG")
 
     parser.add_argument("--roi", type=str, default=None, help="Dialogue ROI as x,y,w,h")
     parser.add_argument("--select-roi", action="store_true", help="Open ROI selection UI")
+    parser.add_argument(
+        "--region",
+        action="append",
+        default=[],
+        help="Named ROI as name=x,y,w,h[@threshold]; repeat for name plates, dialogue, menus",
+    )
 
     parser.add_argument("--source-lang", type=str, default="ja")
     parser.add_argument("--target-lang", type=str, default="ko")
     parser.add_argument("--translator", type=str, default="google", choices=["google", "deepl", "none"])
     parser.add_argument("--deepl-api-key", type=str, default=None)
-
-    parser.add_argument("--ocr-interval", type=float, default=0.35)
+    parser.add_argument("--deepl-url", type=str, default=None, help="Override the DeepL endpoint URL")
+    parser.add_argument("--translate-timeout", type=float, default=8.0)
+    parser.add_argument("--translate-retries", type=int, default=2)
+    parser.add_argument(
+        "--translation-cache",
+        type=str,
+        default=None,
+        help="Translation cache path (default <log-dir>/translations.sqlite3)",
+    )
+    parser.add_argument("--translation-cache-ttl-days", type=float, default=30.0)
+    parser.add_argument("--no-translation-cache", action="store_true")
+    parser.add_argument(
+        "--translation-memory-similarity",
+        type=float,
+        default=0.9,
+        help="Reuse a known translation when the OCR text is at least this similar",
+    )
+    parser.add_argument("--no-translation-memory", action="store_true", help="Disable fuzzy reuse of past translations")
+    parser.add_argument(
+        "--hedge-translator",
+        type=str,
+        default=None,
+        choices=["google", "deepl", "none"],
+        help="Also ask this engine when the main translator is slow and use the first answer (none: show the source)",
+    )
+    parser.add_argument("--hedge-delay-ms", type=float, default=600.0, help="Wait before hedging until latency samples exist")
+    parser.add_argument("--hedge-max-delay-ms", type=float, default=2000.0)
+    parser.add_argument("--hedge-fixed-delay", action="store_true", help="Keep --hedge-delay-ms instead of the recent p95")
+
+    parser.add_argument("--ocr-interval", type=float, default=0.35, help="OCR period for --scheduler fixed")
+    parser.add_argument(
+        "--scheduler",
+        type=str,
+        default="adaptive",
+        choices=["adaptive", "fixed"],
+        help="adaptive: burst after ROI changes and back off while static; fixed: every --ocr-interval",
+    )
+    parser.add_argument("--min-ocr-rate", type=float, default=3.0, help="Adaptive scheduler: slowest checks per second")
+    parser.add_argument("--max-ocr-rate", type=float, default=10.0, help="Adaptive scheduler: fastest checks per second")
     parser.add_argument("--pre-scale", type=float, default=2.0)
     parser.add_argument("--threshold", type=int, default=170)
     parser.add_argument("--min-confidence", type=float, default=0.45)
+    parser.add_argument(
+        "--preprocess",
+        type=str,
+        default="gray,upscale,threshold,median",
+        help="Comma-separated preprocess steps: gray, upscale, threshold, lut, otsu, adaptive, median",
+    )
+    parser.add_argument("--interpolation", type=str, default="cubic", choices=["nearest", "linear", "area", "cubic"])
+    parser.add_argument(
+        "--typewriter-settle",
+        type=float,
+        default=0.0,
+        help="Hold text that is still being typed out until it is unchanged for this many seconds",
+    )
+    parser.add_argument("--typewriter-preview", action="store_true", help="Show source text while it is typing")
+    parser.add_argument(
+        "--det-cache",
+        action="store_true",
+        help="Reuse detected text boxes and run recognition only while the layout is stable",
+    )
+    parser.add_argument("--det-refresh", type=float, default=3.0, help="Force a full detection pass after this many seconds")
+    parser.add_argument(
+        "--det-min-score",
+        type=float,
+        default=0.8,
+        help="Re-detect when a cached line scores below this, or below its own full-pass score if that is lower",
+    )
+    parser.add_argument(
+        "--ocr-processes",
+        type=int,
+        default=0,
+        help="Run OCR in this many worker processes (0 keeps it in the main process)",
+    )
+    parser.add_argument("--no-change-gate", action="store_true", help="OCR every tick even if the ROI is static")
+    parser.add_argument("--change-delta", type=int, default=24, help="Per-pixel change threshold (0-255)")
+    parser.add_argument("--change-ratio", type=float, default=0.0005, help="Changed pixel ratio that triggers OCR")
 
     parser.add_argument("--overlay-x", type=int, default=60)
     parser.add_argument("--overlay-y", type=int, default=540)
     parser.add_argument("--overlay-width", type=int, default=1160)
     parser.add_argument("--font-size", type=int, default=28)
     parser.add_argument("--show-source", action="store_true")
+    parser.add_argument(
+        "--pending-display",
+        type=str,
+        default="source",
+        choices=["source", "marker"],
+        help="Overlay text for a line still being translated: the recognized source or a marker",
+    )
     parser.add_argument("--no-click-through", action="store_true")
+    parser.add_argument("--headless", action="store_true", help="Run without the Qt overlay and write results to --sink")
+    parser.add_argument(
+        "--sink",
+        action="append",
+        default=[],
+        help="Headless result output: stdout, file:<path> or tcp:[host:]port (repeatable, default stdout)",
+    )
 
     parser.add_argument("--log-dir", type=str, default="logs")
     parser.add_argument("--no-log", action="store_true")
     parser.add_argument("--log-source-only", action="store_true")
+    parser.add_argument("--log-flush-sec", type=float, default=1.0, help="Write buffered log entries at least this often")
+    parser.add_argument("--log-fsync", action="store_true", help="fsync transcript files on every flush")
+    parser.add_argument("--log-rotate-mb", type=float, default=32.0, help="Start a new transcript part past this size (0 = never)")
+    parser.add_argument("--log-no-compress", action="store_true", help="Keep rotated transcript parts uncompressed")
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve Prometheus metrics on this localhost port (0 = off)",
+    )
+    parser.add_argument("--metrics-host", type=str, default="127.0.0.1")
+    parser.add_argument("--metrics-snapshot", type=str, default=None, help="Write a JSON metrics snapshot to this file")
+    parser.add_argument("--metrics-snapshot-sec", type=float, default=10.0)
+    parser.add_argument("--no-metrics", action="store_true", help="Disable runtime metrics collection")
 
     return parser
 
 
-def main() -> int:
-    args = _build_parser().parse_args()
+def _run_headless(pipeline) -> int:
+    # Until Ctrl+C, or until a finite source (video, images) is fully processed.
+    try:
+        while not (pipeline.capture.finished and pipeline.idle):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    return 0
 
+
+def _run(args: argparse.Namespace, stdout) -> int:
     from .capture import CaptureWorker
-    from .ocr_engine import OCRProcessor
-    from .overlay import run_overlay_app
+    from .metrics import MetricsRegistry, MetricsServer, MetricsSnapshotWriter, instrument_pipeline
+    from .ocr_process import build_ocr_processor
     from .pipeline import PipelineWorker
-    from .roi import clamp_roi, default_dialogue_roi, parse_roi, select_roi
+    from .roi import clamp_roi, default_dialogue_roi, parse_regions, parse_roi, select_roi
+    from .sinks import build_sinks
     from .state import SharedOverlayState
-    from .translator import build_translator
 
     capture_config = CaptureConfig(
         device_index=args.device,
         width=args.width,
         height=args.height,
         fps=args.fps,
+        source=args.source,
+        source_path=args.source_path,
+        realtime=not args.fast,
+        loop=args.loop,
+        decode=args.capture_decode.replace("-", "_"),
+        decode_fps=args.decode_fps,
+        fourcc=args.fourcc,
     )
 
     ocr_config = OCRConfig(
@@ -77,13 +317,42 @@ def main() -> int:
         pre_scale=args.pre_scale,
         threshold=args.threshold,
         min_confidence=args.min_confidence,
+        preprocess=parse_steps(args.preprocess),
+        interpolation=args.interpolation,
+        change_gate=not args.no_change_gate,
+        change_pixel_delta=args.change_delta,
+        change_min_ratio=args.change_ratio,
+        typewriter_settle_sec=args.typewriter_settle,
+        typewriter_preview=args.typewriter_preview,
+        det_cache=args.det_cache,
+        det_refresh_sec=args.det_refresh,
+        det_min_score=args.det_min_score,
+        processes=args.ocr_processes,
+        scheduler=args.scheduler,
+        min_rate_hz=args.min_ocr_rate,
+        max_rate_hz=args.max_ocr_rate,
     )
 
+    from .translation_cache import DEFAULT_CACHE_NAME
+
     translation_config = TranslationConfig(
         engine=args.translator,
         source_lang=args.source_lang,
         target_lang=args.target_lang,
         deepl_api_key=args.deepl_api_key or os.getenv("DEEPL_API_KEY"),
+        deepl_url=args.deepl_url,
+        request_timeout_sec=args.translate_timeout,
+        max_retries=args.translate_retries,
+        cache_enabled=not args.no_translation_cache,
+        cache_path=args.translation_cache or str(Path(args.log_dir) / DEFAULT_CACHE_NAME),
+        cache_ttl_sec=args.translation_cache_ttl_days * 86400.0,
+        memory_enabled=not args.no_translation_memory,
+        memory_min_similarity=args.translation_memory_similarity,
+        memory_seed_dir=None if args.no_log else args.log_dir,
+        hedge_engine=args.hedge_translator,
+        hedge_delay_sec=args.hedge_delay_ms / 1000.0,
+        hedge_adaptive=not args.hedge_fixed_delay,
+        hedge_max_delay_sec=args.hedge_max_delay_ms / 1000.0,
     )
 
     overlay_config = OverlayConfig(
@@ -93,27 +362,82 @@ def main() -> int:
         font_size=args.font_size,
         show_source=args.show_source,
         click_through=not args.no_click_through,
+        pending_display=args.pending_display,
     )
 
     log_config = LogConfig(
         enabled=not args.no_log,
         directory=args.log_dir,
         source_only=args.log_source_only,
+        flush_interval_sec=args.log_flush_sec,
+        fsync=args.log_fsync,
+        rotate_mb=args.log_rotate_mb,
+        compress_rotated=not args.log_no_compress,
     )
 
-    capture = CaptureWorker(capture_config)
-    capture.start()
+    metrics_config = MetricsConfig(
+        enabled=not args.no_metrics,
+        host=args.metrics_host,
+        port=args.metrics_port,
+        snapshot_path=args.metrics_snapshot,
+        snapshot_interval_sec=args.metrics_snapshot_sec,
+    )
 
-    frame = _wait_for_first_frame(capture)
-    if frame is None:
-        capture.stop()
-        raise RuntimeError("No frame received from capture device. Check capture card connection.")
+    regions = parse_regions(args.region)
+
+    # The OCR models and the translator (cache, memory seeding, connection)
+    # load in the background while capture opens and the ROI is chosen.
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    sinks = build_sinks(args.sink, stdout=stdout) if args.headless else None
+    ocr_task = _BackgroundTask("ocr-load", lambda: build_ocr_processor(ocr_config))
+    translator_task = _BackgroundTask("translator-load", lambda: _prepare_translator(translation_config))
 
-    if args.select_roi:
-        roi = select_roi(frame)
-    else:
-        roi = parse_roi(args.roi) or default_dialogue_roi(frame)
-    roi = clamp_roi(roi, frame)
+    capture = CaptureWorker(capture_config)
+    try:
+        step = time.perf_counter()
+        capture.start()
+        frame = _wait_for_first_frame(capture)
+        # Device open, the driver starting the stream, then the first decode.
+        timings["capture_open"] = capture.open_sec
+        timings["stream_start"] = capture.stream_start_sec
+        timings["first_frame"] = time.perf_counter() - step
+        if frame is None:
+            raise RuntimeError(
+                f"No frame received from {capture.source.describe()}. Check capture card connection."
+            )
+
+        step = time.perf_counter()
+        roi = None
+        if regions:
+            regions = tuple(replace(region, rect=clamp_roi(region.rect, frame)) for region in regions)
+        else:
+            if args.select_roi:
+                roi = select_roi(frame)
+            else:
+                roi = parse_roi(args.roi) or default_dialogue_roi(frame)
+            roi = clamp_roi(roi, frame)
+        timings["roi"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        ocr_processor = ocr_task.result()
+        translator = translator_task.result()
+        timings["load_wait"] = time.perf_counter() - step
+        timings["ocr_load"] = ocr_task.seconds
+        timings["translator_load"] = translator_task.seconds
+
+        step = time.perf_counter()
+        rects = [region.rect for region in regions] if regions else [roi]
+        ocr_processor.warm_up([(height, width) for _, _, width, height in rects])
+        timings["ocr_warm_up"] = time.perf_counter() - step
+    except BaseException:
+        capture.stop()
+        ocr_task.discard()
+        translator_task.discard()
+        if sinks is not None:
+            sinks.close()
+        raise
+    timings["total"] = time.perf_counter() - started
 
     app_config = AppConfig(
         capture=capture_config,
@@ -122,6 +446,8 @@ def main() -> int:
         overlay=overlay_config,
         log=log_config,
         roi=roi,
+        regions=regions,
+        metrics=metrics_config,
     )
 
     transcript_logger = None
@@ -131,20 +457,25 @@ def main() -> int:
             source_lang=app_config.translation.source_lang,
             target_lang=app_config.translation.target_lang,
             source_only=app_config.log.source_only,
+            flush_interval_sec=app_config.log.flush_interval_sec,
+            fsync=app_config.log.fsync,
+            rotate_bytes=int(app_config.log.rotate_mb * 1024 * 1024),
+            compress_rotated=app_config.log.compress_rotated,
         )
 
     print(
         "Starting OCR translator",
-        f"device={app_config.capture.device_index}",
-        f"roi={app_config.roi}",
+        f"source={capture.source.describe()}",
+        f"roi={app_config.roi}" if app_config.roi else f"regions={[r.name for r in app_config.regions]}",
         f"translator={app_config.translation.engine}",
         f"log_dir={transcript_logger.session_dir if transcript_logger else 'disabled'}",
+        f"sinks={sinks.describe()}" if sinks is not None else "overlay",
     )
+    _print_startup(timings)
 
-    ocr_processor = OCRProcessor(app_config.ocr)
-    translator = build_translator(app_config.translation)
-    state = SharedOverlayState()
+    state = SharedOverlayState([region.name for region in app_config.regions] if len(app_config.regions) > 1 else ())
 
+    metrics = MetricsRegistry() if app_config.metrics.enabled else None
     pipeline = PipelineWorker(
         capture=capture,
         ocr=ocr_processor,
@@ -153,18 +484,92 @@ def main() -> int:
         roi=app_config.roi,
         ocr_config=app_config.ocr,
         logger=transcript_logger,
+        stage_hook=metrics.observe_stage if metrics is not None else None,
+        translation_queue_size=app_config.translation.queue_size,
+        regions=app_config.regions,
+        result_hook=sinks.emit if sinks is not None else None,
     )
 
+    exporters = []
+    if metrics is not None:
+        instrument_pipeline(metrics, pipeline, ocr_processor, translator, transcript_logger)
+        for phase, seconds in timings.items():
+            metrics.gauge("startup_seconds", "Time spent in each startup phase", {"phase": phase}).set(seconds)
+        if app_config.metrics.port > 0:
+            server = MetricsServer(metrics, app_config.metrics.host, app_config.metrics.port)
+            server.start()
+            exporters.append(server)
+            print(f"Metrics at http://{app_config.metrics.host}:{app_config.metrics.port}/metrics")
+        if app_config.metrics.snapshot_path:
+            exporters.append(
+                MetricsSnapshotWriter(metrics, app_config.metrics.snapshot_path, app_config.metrics.snapshot_interval_sec)
+            )
+            exporters[-1].start()
+
     pipeline.start()
 
     try:
-        return run_overlay_app(app_config.overlay, state.get_snapshot)
+        if args.headless:
+            return _run_headless(pipeline)
+        from .overlay import run_overlay_app
+
+        return run_overlay_app(app_config.overlay, state)
     finally:
         pipeline.stop()
         capture.stop()
+        if sinks is not None:
+            sinks.close()
+        for exporter in exporters:
+            exporter.stop()
+        print(
+            f"OCR calls={pipeline.ocr_calls} skipped_static={pipeline.ocr_skipped}",
+            f"detection_passes={ocr_processor.detection_passes} recognition_only={ocr_processor.recognition_passes}",
+        )
+        print(
+            "Translations",
+            f"submitted={pipeline.translation.submitted}",
+            f"completed={pipeline.translation.completed}",
+            f"dropped={pipeline.translation.dropped}",
+            f"stale={pipeline.translation.stale}",
+            f"max_depth={pipeline.translation.max_depth}",
+        )
+        _print_cache_stats(translator)
+        translator.close()
+        ocr_processor.close()
         if transcript_logger is not None:
             transcript_logger.close()
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "bench":
+        from .bench import main as bench_main
+
+        return bench_main(argv[1:])
+    if argv and argv[0] == "batch":
+        from .batch import main as batch_main
+
+        return batch_main(argv[1:])
+    if argv and argv[0] == "search":
+        from .transcript_index import main as search_main
+
+        return search_main(argv[1:])
+
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.fourcc is not None and len(args.fourcc) != 4:
+        parser.error("--fourcc takes a four-character code such as MJPG or YUY2")
+    if args.headless:
+        if args.select_roi:
+            parser.error("--select-roi needs a display; use --roi or --region with --headless")
+        args.sink = args.sink or ["stdout"]
+        if "stdout" in args.sink:
+            # stdout carries the JSONL results; status lines move to stderr.
+            stdout = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                return _run(args, stdout)
+    return _run(args, sys.stdout)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
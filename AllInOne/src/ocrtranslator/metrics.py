@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from sub-millisecond preprocess steps up to slow
+# translation requests.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    def __init__(self) -> None:
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _Callback:
+    # Reads an existing counter or queue size at scrape time, so the hot
+    # path pays nothing for it.
+    def __init__(self, read: Callable[[], float]) -> None:
+        self._read = read
+
+    @property
+    def value(self) -> float:
+        try:
+            return float(self._read())
+        except Exception:
+            return float("nan")
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._bounds = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def state(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    @property
+    def bounds(self) -> Tuple[float, ...]:
+        return self._bounds
+
+    def quantile(self, q: float) -> float:
+        # Linear interpolation inside the bucket, as histogram_quantile() does.
+        counts, _, total = self.state()
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if index == len(self._bounds):
+                    return self._bounds[-1]
+                lower = self._bounds[index - 1] if index else 0.0
+                return lower + (self._bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return self._bounds[-1]
+
+
+class _Family:
+    def __init__(self, kind: str, help_text: str) -> None:
+        self.kind = kind
+        self.help = help_text
+        self.children: Dict[Labels, Any] = {}
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "ocrtranslator") -> None:
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._families: Dict[str, _Family] = {}
+        self._stages: Dict[str, Histogram] = {}
+        self.started_at = time.time()
+
+    def counter(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._child(name, "counter", help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._child(name, "gauge", help_text, labels, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._child(name, "histogram", help_text, labels, lambda: Histogram(buckets))
+
+    def collect(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        read: Callable[[], float],
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if kind not in ("counter", "gauge"):
+            raise ValueError(f"Callback metrics must be counters or gauges, not {kind}")
+        self._child(name, kind, help_text, labels, lambda: _Callback(read))
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        # Matches PipelineWorker's stage hook.
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self.histogram("stage_seconds", "Pipeline stage latency", {"stage": stage})
+            self._stages[stage] = histogram
+        histogram.observe(seconds)
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        for name, family in self._items():
+            full = f"{self._prefix}_{name}"
+            lines.append(f"# HELP {full} {family.help}")
+            lines.append(f"# TYPE {full} {family.kind}")
+            for labels, metric in list(family.children.items()):
+                if isinstance(metric, Histogram):
+                    counts, total_sum, total = metric.state()
+                    cumulative = 0
+                    for bound, count in zip(metric.bounds, counts):
+                        cumulative += count
+                        le = labels + (("le", _format_value(bound)),)
+                        lines.append(f"{full}_bucket{_format_labels(le)} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(labels + (('le', '+Inf'),))} {total}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(total_sum)}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {total}")
+                else:
+                    lines.append(f"{full}{_format_labels(labels)} {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {}
+        for name, family in self._items():
+            values = []
+            for labels, metric in list(family.children.items()):
+                item: Dict[str, Any] = {"labels": dict(labels)} if labels else {}
+                if isinstance(metric, Histogram):
+                    _, total_sum, total = metric.state()
+                    item.update(
+                        count=total,
+                        sum=total_sum,
+                        p50=metric.quantile(0.50),
+                        p95=metric.quantile(0.95),
+                        p99=metric.quantile(0.99),
+                    )
+                else:
+                    value = metric.value
+                    item["value"] = value if value == value else None
+                values.append(item)
+            metrics[name] = {"type": family.kind, "values": values}
+        return {
+            "timestamp": time.time(),
+            "uptime_sec": time.time() - self.started_at,
+            "metrics": metrics,
+        }
+
+    def _items(self) -> List[Tuple[str, _Family]]:
+        with self._lock:
+            return sorted(self._families.items())
+
+    def _child(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        labels: Optional[Dict[str, str]],
+        factory: Callable[[], Any],
+    ) -> Any:
+        key: Labels = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = _Family(kind, help_text)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family.kind}")
+            metric = family.children.get(key)
+            if metric is None:
+                metric = family.children[key] = factory()
+            return metric
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464) -> None:
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        if self._server is None:
+            return self._host, self._port
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        registry = self._registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                path = self.path.split("?", 1)[0]
+                if path in ("/", "/metrics"):
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        self._server = ThreadingHTTPServer((self._host, self._port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._server = None
+
+
+class MetricsSnapshotWriter:
+    def __init__(self, registry: MetricsRegistry, path: str, interval_sec: float = 10.0) -> None:
+        self._registry = registry
+        self._path = Path(path)
+        self._interval_sec = max(0.1, interval_sec)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def write(self) -> None:
+        # Written next to the target and renamed, so readers never see half a file.
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps(self._registry.snapshot(), indent=2), encoding="utf-8")
+            os.replace(tmp, self._path)
+            self.writes += 1
+        except OSError as exc:
+            self.errors += 1
+            print(f"Metrics snapshot failed: {exc}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval_sec):
+            self.write()
+        self.write()
+
+
+def instrument_pipeline(registry: MetricsRegistry, pipeline: Any, ocr: Any, translator: Any, logger: Any = None) -> None:
+    # Everything here reads counters the components already keep; only the
+    # stage histograms are updated on the hot path (through the stage hook).
+    from .translator import find_layer
+
+    capture = pipeline.capture
+    stage = pipeline.translation
+    registry.collect("capture_frames_total", "counter", "Frames published by the capture thread", lambda: capture.frames_captured)
+    registry.collect(
+        "capture_frames_dropped_total",
+        "counter",
+        "Frames replaced by a newer one before the pipeline read them",
+        lambda: capture.frames_dropped,
+    )
+    registry.collect(
+        "capture_frames_skipped_total",
+        "counter",
+        "Frames grabbed but never decoded because nothing read them",
+        lambda: capture.frames_skipped,
+    )
+    registry.collect("capture_read_failures_total", "counter", "Source reads that returned no frame", lambda: capture.read_failures)
+    registry.collect("capture_fps", "gauge", "Smoothed capture frame rate", lambda: capture.fps)
+
+    registry.collect("ocr_calls_total", "counter", "OCR calls", lambda: pipeline.ocr_calls)
+    registry.collect("ocr_skipped_static_total", "counter", "Ticks skipped by the change gate", lambda: pipeline.ocr_skipped)
+    registry.collect("ocr_failures_total", "counter", "OCR calls that raised", lambda: pipeline.ocr_failures)
+    if hasattr(ocr, "detection_passes"):
+        registry.collect("ocr_detection_passes_total", "counter", "Full detection passes", lambda: ocr.detection_passes)
+        registry.collect("ocr_recognition_only_total", "counter", "Recognition-only passes", lambda: ocr.recognition_passes)
+    if hasattr(ocr, "restarts"):
+        registry.collect("ocr_worker_restarts_total", "counter", "OCR worker process restarts", lambda: ocr.restarts)
+    registry.collect("ocr_rate_hz", "gauge", "Current scheduler OCR rate", lambda: 1.0 / max(pipeline.scheduler.interval, 1e-6))
+    registry.collect("dedupe_suppressed_total", "counter", "Lines suppressed as duplicates", lambda: pipeline.dedupe_suppressed)
+
+    registry.collect("translation_submitted_total", "counter", "Lines queued for translation", lambda: stage.submitted)
+    registry.collect("translation_completed_total", "counter", "Lines translated", lambda: stage.completed)
+    registry.collect("translation_dropped_total", "counter", "Lines superseded before translation", lambda: stage.dropped)
+    registry.collect("translation_stale_total", "counter", "Results that arrived after a newer line", lambda: stage.stale)
+    registry.collect("translation_queue_depth", "gauge", "Lines waiting for translation", lambda: stage.depth)
+    registry.collect("translator_failures_total", "counter", "Failed translation requests", lambda: translator.failures)
+    registry.collect("translator_fallbacks_total", "counter", "Lines shown untranslated after a failure", lambda: translator.fallbacks)
+
+    layer = find_layer(translator, "cache")
+    cache = layer.cache if layer is not None else None
+    if cache is not None:
+        for kind in ("memory_hits", "disk_hits", "misses"):
+            registry.collect(
+                "translation_cache_lookups_total",
+                "counter",
+                "Translation cache lookups by result",
+                lambda kind=kind: getattr(cache.stats, kind),
+                {"result": kind},
+            )
+    layer = find_layer(translator, "memory")
+    memory = layer.memory if layer is not None else None
+    if memory is not None:
+        for kind in ("exact_hits", "fuzzy_hits", "misses", "over_budget"):
+            registry.collect(
+                "translation_memory_lookups_total",
+                "counter",
+                "Translation memory lookups by result",
+                lambda kind=kind: getattr(memory.stats, kind),
+                {"result": kind},
+            )
+
+    hedged = find_layer(translator, "hedged")
+    if hedged is not None:
+        registry.collect("translation_hedged_total", "counter", "Requests also sent to the hedge engine", lambda: hedged.hedged)
+        registry.collect("translation_hedge_delay_seconds", "gauge", "Current hedge delay", lambda: hedged.hedge_delay)
+        for engine in hedged.engines:
+            labels = {"engine": engine.name}
+            registry.collect("translator_engine_requests_total", "counter", "Requests per engine", lambda e=engine: e.requests, labels)
+            registry.collect("translator_engine_wins_total", "counter", "Answers used per engine", lambda e=engine: e.wins, labels)
+            registry.collect("translator_engine_failures_total", "counter", "Failed requests per engine", lambda e=engine: e.failures, labels)
+            registry.collect(
+                "translator_engine_p95_seconds",
+                "gauge",
+                "Recent p95 request latency per engine",
+                lambda e=engine: e.latency.quantile(0.95),
+                labels,
+            )
+
+    if logger is not None:
+        writer = logger.writer
+        registry.collect("log_queue_depth", "gauge", "Transcript entries waiting to be written", lambda: writer.depth)
+        registry.collect("log_entries_written_total", "counter", "Transcript entries written", lambda: writer.written)
+        registry.collect("log_stalls_total", "counter", "Log calls that waited for a full queue", lambda: writer.stalls)
+        registry.collect("log_errors_total", "counter", "Transcript write or flush errors", lambda: writer.errors)
+        registry.collect("log_rotations_total", "counter", "Transcript rotations", lambda: writer.rotations)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import re
-from typing import Any
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
 
 from .config import OCRConfig
+from .preprocess import Preprocessor
 
 _LANG_MAP = {
     "ja": "japan",
@@ -15,10 +18,49 @@ _LANG_MAP = {
     "ch": "ch",
 }
 
+# Blank rows between regions stacked into one batched OCR image.
+_BAND_GAP = 24
+
+# Padding around cached line boxes when cropping for recognition-only passes.
+_CROP_PAD = 6
+# Pixels this far from the background count as ink for the layout check.
+_INK_DELTA = 64
+# How far below its own full-pass score a cached line may read before the
+# layout is distrusted, for lines that never reach det_min_score.
+_SCORE_SLACK = 0.1
+
+OCRLine = Tuple[Any, str, float]
+
+
+def warm_up_frame(height: int, width: int) -> np.ndarray:
+    # Dark text on a light box, so both detection and recognition run.
+    frame = np.full((max(height, 32), max(width, 64), 3), 235, dtype=np.uint8)
+    scale = max(0.5, min(frame.shape[0] / 60.0, frame.shape[1] / 400.0))
+    cv2.putText(frame, "Warm up 0123", (8, frame.shape[0] // 2), cv2.FONT_HERSHEY_SIMPLEX, scale, (20, 20, 20), 2)
+    return frame
+
+
+@dataclass
+class _DetectionLayout:
+    shape: Tuple[int, ...]
+    boxes: List[Any]
+    crops: List[Tuple[int, int, int, int]]
+    outside: np.ndarray
+    outside_pixels: int
+    detected_at: float
+    # Per line: the score a recognition-only pass must reach.
+    min_scores: List[float]
+
 
 class OCRProcessor:
     def __init__(self, config: OCRConfig) -> None:
         self._config = config
+        self._preprocessor = Preprocessor.from_config(config)
+        self._preprocessors: Dict[int, Preprocessor] = {}
+        self.last_timings: Dict[str, float] = {}
+        self._layout: Optional[_DetectionLayout] = None
+        self.detection_passes = 0
+        self.recognition_passes = 0
         lang = _LANG_MAP.get(config.source_lang.lower(), config.source_lang)
 
         try:
@@ -31,40 +73,127 @@ class OCRProcessor:
         self._ocr = PaddleOCR(use_angle_cls=False, lang=lang, show_log=False)
 
     def preprocess(self, frame: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        if self._config.pre_scale > 1.0:
-            gray = cv2.resize(
-                gray,
-                None,
-                fx=self._config.pre_scale,
-                fy=self._config.pre_scale,
-                interpolation=cv2.INTER_CUBIC,
-            )
-
-        _, binary = cv2.threshold(
-            gray,
-            self._config.threshold,
-            255,
-            cv2.THRESH_BINARY,
-        )
-        return cv2.medianBlur(binary, 3)
+        return self._preprocessor.run(frame)
 
     def recognize(self, frame: np.ndarray) -> str:
-        processed = self.preprocess(frame)
-        result = self._ocr.ocr(processed, cls=False)
-        if not result:
-            return ""
+        return self.recognize_many([frame])[0]
 
-        lines = result[0] if isinstance(result, list) else result
-        texts = []
+    def recognize_many(
+        self,
+        frames: Sequence[np.ndarray],
+        thresholds: Optional[Sequence[Optional[int]]] = None,
+    ) -> List[str]:
+        if not frames:
+            return []
+        thresholds = thresholds or [None] * len(frames)
 
-        for item in lines:
-            text, score = self._extract_text_score(item)
+        started = time.perf_counter()
+        step_timings: Dict[str, float] = {}
+        processed = []
+        for frame, threshold in zip(frames, thresholds):
+            preprocessor = self._preprocessor_for(threshold)
+            image = preprocessor.run(frame)
+            # Preprocessors reuse their output buffer, so keep a copy when
+            # several regions go through the same one.
+            processed.append(image if len(frames) == 1 else image.copy())
+            for step, seconds in preprocessor.last_timings.items():
+                step_timings[f"preprocess.{step}"] = step_timings.get(f"preprocess.{step}", 0.0) + seconds
+
+        if len(processed) == 1:
+            canvas = processed[0]
+            bands = [(0, canvas.shape[0])]
+        else:
+            canvas, bands = _stack_regions(processed)
+        preprocessed = time.perf_counter()
+
+        lines = self._recognize_cached(canvas) if self._config.det_cache else None
+        if lines is None:
+            lines = self._detect_and_recognize(canvas)
+        step_timings["preprocess"] = preprocessed - started
+        step_timings["inference"] = time.perf_counter() - preprocessed
+        self.last_timings = step_timings
+
+        texts: List[List[str]] = [[] for _ in frames]
+        for box, text, score in lines:
             if text and score >= self._config.min_confidence:
-                texts.append(text)
+                texts[_band_index(bands, box)].append(text)
+        return [_normalize_text(" ".join(parts)) for parts in texts]
+
+    def warm_up(self, shapes: Sequence[Tuple[int, int]]) -> None:
+        # The first inference pays Paddle's lazy allocation and kernel
+        # selection; do it on ROI-sized frames before real text arrives.
+        self.recognize_many([warm_up_frame(height, width) for height, width in shapes])
+        self.reset()
+
+    def reset(self) -> None:
+        # Drops the cached detection layout (e.g. of the warm-up frame) and
+        # the counters, so they describe real frames only.
+        self._layout = None
+        self.last_timings = {}
+        self.detection_passes = 0
+        self.recognition_passes = 0
+
+    def close(self) -> None:
+        return
+
+    def _preprocessor_for(self, threshold: Optional[int]) -> Preprocessor:
+        if threshold is None or threshold == self._config.threshold:
+            return self._preprocessor
+        preprocessor = self._preprocessors.get(threshold)
+        if preprocessor is None:
+            preprocessor = Preprocessor.from_config(self._config, threshold=threshold)
+            self._preprocessors[threshold] = preprocessor
+        return preprocessor
+
+    def _detect_and_recognize(self, canvas: np.ndarray) -> List[OCRLine]:
+        self.detection_passes += 1
+        lines = self._run_ocr(canvas)
+        if self._config.det_cache:
+            kept = [(box, score) for box, text, score in lines if text and box is not None]
+            self._layout = _build_layout(
+                canvas,
+                [box for box, _ in kept],
+                [min(self._config.det_min_score, score - _SCORE_SLACK) for _, score in kept],
+            )
+        return lines
+
+    def _recognize_cached(self, canvas: np.ndarray) -> Optional[List[OCRLine]]:
+        # Reuse the last detected line boxes and run only the recognizer on
+        # them. None means the layout can't be trusted and a full pass runs.
+        layout = self._layout
+        if layout is None or layout.shape != canvas.shape:
+            return None
+        if time.monotonic() - layout.detected_at >= self._config.det_refresh_sec:
+            return None
+        if _ink_ratio_outside(canvas, layout) > self._config.det_layout_ratio:
+            return None
+
+        crops = [_as_bgr(canvas[y0:y1, x0:x1]) for x0, y0, x1, y1 in layout.crops]
+        results = _flatten_rec_result(self._ocr.ocr(crops, det=False, cls=False))
+        if len(results) != len(crops):
+            return None
 
-        return _normalize_text(" ".join(texts))
+        lines: List[OCRLine] = []
+        # Each line is held to its own score from the detection pass, so a
+        # line that always reads at 0.6 does not force a re-detect each tick.
+        for box, min_score, (text, score) in zip(layout.boxes, layout.min_scores, results):
+            if not text or score < min_score:
+                return None
+            lines.append((box, text, score))
+        self.recognition_passes += 1
+        return lines
+
+    def _run_ocr(self, image: np.ndarray) -> List[OCRLine]:
+        result = self._ocr.ocr(image, cls=False)
+        if not result:
+            return []
+
+        items = result[0] if isinstance(result, list) else result
+        lines: List[OCRLine] = []
+        for item in items or []:
+            text, score = self._extract_text_score(item)
+            lines.append((item[0] if item else None, text, score))
+        return lines
 
     @staticmethod
     def _extract_text_score(item: Any) -> tuple[str, float]:
@@ -82,6 +211,114 @@ class OCRProcessor:
         return text, score
 
 
+def _build_layout(canvas: np.ndarray, boxes: List[Any], min_scores: List[float]) -> Optional[_DetectionLayout]:
+    if not boxes:
+        return None
+    h, w = canvas.shape[:2]
+    outside = np.full((h, w), 255, dtype=np.uint8)
+    crops: List[Tuple[int, int, int, int]] = []
+    for box in boxes:
+        try:
+            xs = [float(point[0]) for point in box]
+            ys = [float(point[1]) for point in box]
+        except (TypeError, IndexError, ValueError):
+            return None
+        x0 = max(0, int(min(xs)) - _CROP_PAD)
+        y0 = max(0, int(min(ys)) - _CROP_PAD)
+        x1 = min(w, int(max(xs)) + _CROP_PAD + 1)
+        y1 = min(h, int(max(ys)) + _CROP_PAD + 1)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        crops.append((x0, y0, x1, y1))
+        outside[y0:y1, x0:x1] = 0
+
+    return _DetectionLayout(
+        shape=canvas.shape,
+        boxes=boxes,
+        crops=crops,
+        outside=outside,
+        outside_pixels=max(1, cv2.countNonZero(outside)),
+        detected_at=time.monotonic(),
+        min_scores=min_scores,
+    )
+
+
+def _ink_ratio_outside(canvas: np.ndarray, layout: _DetectionLayout) -> float:
+    # New or longer lines put ink where no cached box is; that is the cue
+    # that the detector has to run again.
+    diff = cv2.absdiff(canvas, np.full_like(canvas, _background(canvas)))
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    _, ink = cv2.threshold(diff, _INK_DELTA, 255, cv2.THRESH_BINARY)
+    return cv2.countNonZero(cv2.bitwise_and(ink, layout.outside)) / layout.outside_pixels
+
+
+def _as_bgr(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def _flatten_rec_result(result: Any) -> List[Tuple[str, float]]:
+    # Recognition-only results come back as one list per input image;
+    # flatten them to one (text, score) per crop.
+    pairs: List[Tuple[str, float]] = []
+    for item in result or []:
+        if not item:
+            pairs.append(("", 0.0))
+            continue
+        if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[0], str):
+            item = [item]
+        for text_score in item:
+            try:
+                pairs.append((str(text_score[0]).strip(), float(text_score[1])))
+            except (TypeError, IndexError, ValueError):
+                pairs.append(("", 0.0))
+    return pairs
+
+
+def _stack_regions(images: Sequence[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    width = max(image.shape[1] for image in images)
+    height = sum(image.shape[0] for image in images) + _BAND_GAP * (len(images) - 1)
+    canvas = np.empty((height, width) + images[0].shape[2:], dtype=images[0].dtype)
+
+    bands: List[Tuple[int, int]] = []
+    y = 0
+    for index, image in enumerate(images):
+        h, w = image.shape[:2]
+        band_h = h if index == len(images) - 1 else h + _BAND_GAP
+        # Pad with the region's own background so the detector sees no edges
+        # between regions.
+        canvas[y : y + band_h] = _background(image)
+        canvas[y : y + h, :w] = image
+        bands.append((y, y + h))
+        y += band_h
+    return canvas, bands
+
+
+def _background(image: np.ndarray) -> np.ndarray:
+    border = np.concatenate([image[0], image[-1], image[:, 0], image[:, -1]])
+    return np.median(border, axis=0).astype(image.dtype)
+
+
+def _band_index(bands: Sequence[Tuple[int, int]], box: Any) -> int:
+    if len(bands) == 1:
+        return 0
+    try:
+        center_y = float(np.mean([point[1] for point in box]))
+    except (TypeError, IndexError, ValueError):
+        return 0
+
+    best, best_distance = 0, float("inf")
+    for index, (top, bottom) in enumerate(bands):
+        if top <= center_y < bottom:
+            return index
+        distance = min(abs(center_y - top), abs(center_y - bottom))
+        if distance < best_distance:
+            best, best_distance = index, distance
+    return best
+
+
 def _normalize_text(value: str) -> str:
     value = re.sub(r"\s+", " ", value)
     return value.strip()
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import OCRConfig
+
+# Frames are packed into a worker's shared block at this alignment.
+_ALIGN = 64
+_INITIAL_SHM_BYTES = 4 * 1024 * 1024
+
+FrameLayout = List[Tuple[int, Tuple[int, ...]]]
+
+
+class OCRWorkerError(RuntimeError):
+    pass
+
+
+class _WorkerDown(Exception):
+    pass
+
+
+def _worker_main(config: OCRConfig, tasks: Any, results: Any) -> None:
+    # Ctrl+C reaches the whole process group; shutdown is driven by the parent.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        from .ocr_engine import OCRProcessor
+
+        ocr = OCRProcessor(config)
+    except Exception as exc:
+        results.put(("failed", str(exc)))
+        return
+    results.put(("ready", None))
+
+    shm: Optional[shared_memory.SharedMemory] = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, name, layout, thresholds, warm_up = task
+            if shm is None or shm.name != name:
+                if shm is not None:
+                    shm.close()
+                # Spawned workers share the parent's resource tracker, so
+                # attaching here does not hand ownership to the worker.
+                shm = shared_memory.SharedMemory(name=name)
+
+            frames = [
+                np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset) for offset, shape in layout
+            ]
+            detection_passes = ocr.detection_passes
+            recognition_passes = ocr.recognition_passes
+            try:
+                texts = ocr.recognize_many(frames, thresholds)
+            except Exception as exc:
+                results.put((request_id, "error", str(exc)))
+                continue
+            finally:
+                del frames
+            if warm_up:
+                ocr.reset()
+                detection_passes = recognition_passes = 0
+            results.put(
+                (
+                    request_id,
+                    "ok",
+                    (
+                        texts,
+                        dict(ocr.last_timings),
+                        ocr.detection_passes - detection_passes,
+                        ocr.recognition_passes - recognition_passes,
+                    ),
+                )
+            )
+    finally:
+        if shm is not None:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+
+
+class _OCRWorker:
+    def __init__(self, ctx: Any, config: OCRConfig, index: int) -> None:
+        self._ctx = ctx
+        self._config = config
+        self.name = f"ocr-worker-{index}"
+        self.process: Any = None
+        self.tasks: Any = None
+        self.results: Any = None
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def start(self) -> None:
+        # Fresh queues on every start: a worker killed mid-put can leave the
+        # old ones unusable.
+        self.tasks = self._ctx.Queue()
+        self.results = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._config, self.tasks, self.results),
+            name=self.name,
+            daemon=True,
+        )
+        self.process.start()
+
+    def wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                status, detail = self.results.get(timeout=0.25)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError(f"{self.name} exited during startup (code {self.process.exitcode})")
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{self.name} did not load the OCR model within {timeout:.0f}s")
+                continue
+            if status == "ready":
+                return
+            raise RuntimeError(detail)
+
+    def write(self, frames: Sequence[np.ndarray]) -> FrameLayout:
+        layout: FrameLayout = []
+        offset = 0
+        for frame in frames:
+            layout.append((offset, tuple(frame.shape)))
+            offset += -(-frame.nbytes // _ALIGN) * _ALIGN
+        self._reserve(offset)
+        assert self.shm is not None
+
+        for (start, shape), frame in zip(layout, frames):
+            view = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=start)
+            np.copyto(view, frame, casting="unsafe")
+            del view
+        return layout
+
+    def stop(self, timeout: float) -> None:
+        if self.process is not None and self.process.is_alive():
+            try:
+                self.tasks.put(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout=timeout)
+        self._kill()
+        self._close_queues()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def restart(self, timeout: float) -> None:
+        self._kill()
+        self._close_queues()
+        self.start()
+        self.wait_ready(timeout)
+
+    def _reserve(self, size: int) -> None:
+        if self.shm is not None and self.shm.size >= size:
+            return
+        capacity = max(size, _INITIAL_SHM_BYTES, 2 * (self.shm.size if self.shm is not None else 0))
+        if self.shm is not None:
+            # The worker is idle while we hold it, and it re-attaches by name
+            # on the next task.
+            self.shm.close()
+            self.shm.unlink()
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity)
+
+    def _kill(self) -> None:
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=2.0)
+
+    def _close_queues(self) -> None:
+        for q in (self.tasks, self.results):
+            if q is not None:
+                q.close()
+                q.cancel_join_thread()
+
+
+class ProcessOCRProcessor:
+    def __init__(
+        self,
+        config: OCRConfig,
+        processes: int = 1,
+        start_timeout_sec: float = 180.0,
+        request_timeout_sec: float = 30.0,
+    ) -> None:
+        self._start_timeout_sec = start_timeout_sec
+        self._request_timeout_sec = request_timeout_sec
+        ctx = mp.get_context("spawn")
+        self._workers = [_OCRWorker(ctx, config, index) for index in range(max(1, processes))]
+        # Last in, first out: the worker used most recently goes next, so a
+        # single caller keeps hitting the same detection-layout cache.
+        self._idle: "queue.LifoQueue[_OCRWorker]" = queue.LifoQueue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._restarting = 0
+        self._closed = False
+
+        self.last_timings: Dict[str, float] = {}
+        self.detection_passes = 0
+        self.recognition_passes = 0
+        self.restarts = 0
+
+        try:
+            for worker in self._workers:
+                worker.start()
+            for worker in self._workers:
+                worker.wait_ready(start_timeout_sec)
+        except Exception:
+            self.close()
+            raise
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    @property
+    def processes(self) -> int:
+        return len(self._workers)
+
+    def recognize(self, frame: np.ndarray) -> str:
+        return self.recognize_many([frame])[0]
+
+    def recognize_many(
+        self,
+        frames: Sequence[np.ndarray],
+        thresholds: Optional[Sequence[Optional[int]]] = None,
+    ) -> List[str]:
+        return self._recognize(frames, thresholds)
+
+    def _recognize(
+        self,
+        frames: Sequence[np.ndarray],
+        thresholds: Optional[Sequence[Optional[int]]] = None,
+        warm_up: bool = False,
+    ) -> List[str]:
+        if not frames:
+            return []
+        thresholds = list(thresholds or [None] * len(frames))
+
+        # Each call holds one worker, so concurrent callers spread across
+        # the pool.
+        worker = self._acquire()
+        try:
+            started = time.perf_counter()
+            layout = worker.write(frames)
+            assert worker.shm is not None
+            request_id = next(self._ids)
+            worker.tasks.put((request_id, worker.shm.name, layout, thresholds, warm_up))
+            transferred = time.perf_counter()
+
+            texts, timings, detection_passes, recognition_passes = self._wait(worker, request_id)
+            finished = time.perf_counter()
+        except _WorkerDown as exc:
+            # The worker rejoins the pool from its restart thread once its
+            # model is loaded again; this call fails right away.
+            self._restart_in_background(worker)
+            raise OCRWorkerError(f"{exc}; restarting") from None
+        except BaseException:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+
+        worker_time = timings.get("preprocess", 0.0) + timings.get("inference", 0.0)
+        timings["transfer"] = transferred - started
+        timings["ipc"] = max(0.0, finished - transferred - worker_time)
+        with self._lock:
+            self.last_timings = timings
+            self.detection_passes += detection_passes
+            self.recognition_passes += recognition_passes
+        return texts
+
+    def warm_up(self, shapes: Sequence[Tuple[int, int]]) -> None:
+        from .ocr_engine import warm_up_frame
+
+        # One call per worker, in parallel: each call holds a worker until it
+        # returns, so every process gets its own warm-up pass, after which
+        # the worker resets its layout cache and counters.
+        frames = [warm_up_frame(height, width) for height, width in shapes]
+        errors: List[Exception] = []
+
+        def run() -> None:
+            try:
+                self._recognize(frames, warm_up=True)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=run, name="ocr-warm-up", daemon=True) for _ in self._workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self._lock:
+            self.last_timings = {}
+            self.detection_passes = 0
+            self.recognition_passes = 0
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        for worker in self._workers:
+            worker.stop(timeout=5.0)
+
+    def _acquire(self) -> _OCRWorker:
+        while True:
+            with self._lock:
+                if self._restarting >= len(self._workers):
+                    raise OCRWorkerError("All OCR workers are restarting")
+            try:
+                return self._idle.get(timeout=0.25)
+            except queue.Empty:
+                continue
+
+    def _wait(self, worker: _OCRWorker, request_id: int) -> Tuple[List[str], Dict[str, float], int, int]:
+        deadline = time.monotonic() + self._request_timeout_sec
+        while True:
+            try:
+                reply = worker.results.get(timeout=0.25)
+            except queue.Empty:
+                if not worker.process.is_alive():
+                    raise _WorkerDown(f"{worker.name} exited with code {worker.process.exitcode}")
+                if time.monotonic() > deadline:
+                    raise _WorkerDown(f"{worker.name} did not answer within {self._request_timeout_sec:.0f}s")
+                continue
+
+            reply_id, status, payload = reply
+            if reply_id != request_id:
+                continue
+            if status != "ok":
+                raise OCRWorkerError(f"{worker.name}: {payload}")
+            return payload
+
+    def _restart_in_background(self, worker: _OCRWorker) -> None:
+        with self._lock:
+            self.restarts += 1
+            self._restarting += 1
+        threading.Thread(target=self._restart, args=(worker,), name=f"{worker.name}-restart", daemon=True).start()
+
+    def _restart(self, worker: _OCRWorker) -> None:
+        try:
+            worker.restart(self._start_timeout_sec)
+        except Exception as exc:
+            # Back in the pool anyway; the next call notices it is down and
+            # restarts it again.
+            print(f"OCR worker restart failed: {exc}")
+        with self._lock:
+            self._restarting -= 1
+            closed = self._closed
+        if closed:
+            worker.stop(timeout=1.0)
+            return
+        self._idle.put(worker)
+
+
+def build_ocr_processor(config: OCRConfig) -> Any:
+    if config.processes > 0:
+        return ProcessOCRProcessor(config, processes=config.processes)
+
+    from .ocr_engine import OCRProcessor
+
+    return OCRProcessor(config)
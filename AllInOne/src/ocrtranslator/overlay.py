@@ -2,20 +2,65 @@ from __future__ import annotations
 
 import platform
 import sys
+from typing import Optional
 
 from PySide6 import QtCore, QtWidgets
 
 from .config import OverlayConfig
-from .state import OverlaySnapshot
+from .state import OverlaySnapshot, SharedOverlayState
+
+
+_STATE_CHANGED = QtCore.QEvent.Type(QtCore.QEvent.registerEventType())
+_PENDING_MARKER = "Translating..."
 
 
 class OverlayWindow(QtWidgets.QWidget):
-    def __init__(self, config: OverlayConfig) -> None:
+    def __init__(self, config: OverlayConfig, state: Optional[SharedOverlayState] = None) -> None:
         super().__init__()
         self._config = config
         self._last_rendered = ""
+        self._rendered_version = -1
         self._build_ui()
 
+        # Pipeline threads only post an event; rendering happens on the GUI
+        # thread and only when the state has actually changed.
+        self._state = state
+        if state is not None:
+            state.add_listener(self._notify)
+            self.update_from_snapshot(state.get_snapshot())
+
+    @property
+    def rendered_version(self) -> int:
+        return self._rendered_version
+
+    @property
+    def rendered_text(self) -> str:
+        return self._label.text()
+
+    def detach(self) -> None:
+        if self._state is not None:
+            self._state.remove_listener(self._notify)
+            self._state = None
+
+    def _notify(self, version: int) -> None:
+        # postEvent is thread-safe; a cross-thread signal emit from Python is
+        # not reliable on every PySide6 release.
+        QtCore.QCoreApplication.postEvent(self, QtCore.QEvent(_STATE_CHANGED))
+
+    def event(self, event: QtCore.QEvent) -> bool:
+        if event.type() == _STATE_CHANGED:
+            self.on_state_changed()
+            return True
+        return super().event(event)
+
+    def on_state_changed(self) -> None:
+        # Several updates posted while the GUI thread was busy collapse into
+        # one render of the latest state.
+        state = self._state
+        if state is None or state.version <= self._rendered_version:
+            return
+        self.update_from_snapshot(state.get_snapshot())
+
     def _build_ui(self) -> None:
         self.setWindowFlags(
             QtCore.Qt.WindowType.FramelessWindowHint
@@ -82,10 +127,15 @@ class OverlayWindow(QtWidgets.QWidget):
         )
 
     def update_from_snapshot(self, snapshot: OverlaySnapshot) -> None:
-        if self._config.show_source:
-            text = f"JP: {snapshot.source_text}\nKO: {snapshot.translated_text}"
+        self._rendered_version = max(self._rendered_version, snapshot.version)
+        if snapshot.regions:
+            text = "\n".join(
+                self._format(region.source_text, region.translated_text, name, region.pending)
+                for name, region in snapshot.regions.items()
+                if region.source_text or region.translated_text
+            )
         else:
-            text = snapshot.translated_text
+            text = self._format(snapshot.source_text, snapshot.translated_text, pending=snapshot.pending)
 
         text = text.strip() or "Waiting for OCR..."
         if text == self._last_rendered:
@@ -94,21 +144,27 @@ class OverlayWindow(QtWidgets.QWidget):
         self._last_rendered = text
         self._label.setText(text)
 
+    def _format(self, source_text: str, translated_text: str, name: str = "", pending: bool = False) -> str:
+        prefix = f"[{name}] " if name else ""
+        if pending:
+            if self._config.show_source:
+                return f"{prefix}JP: {source_text}\n{prefix}KO: {_PENDING_MARKER}"
+            if self._config.pending_display == "marker":
+                return f"{prefix}{_PENDING_MARKER}"
+            return f"{prefix}{source_text}"
+        if self._config.show_source:
+            return f"{prefix}JP: {source_text}\n{prefix}KO: {translated_text}"
+        return f"{prefix}{translated_text}"
+
 
-def run_overlay_app(
-    config: OverlayConfig,
-    get_snapshot,
-    refresh_ms: int = 120,
-) -> int:
+def run_overlay_app(config: OverlayConfig, state: SharedOverlayState) -> int:
     app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
 
-    window = OverlayWindow(config)
+    window = OverlayWindow(config, state)
     window.show()
     window.enable_click_through()
 
-    timer = QtCore.QTimer()
-    timer.setInterval(refresh_ms)
-    timer.timeout.connect(lambda: window.update_from_snapshot(get_snapshot()))
-    timer.start()
-
-    return app.exec()
+    try:
+        return app.exec()
+    finally:
+        window.detach()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .bench import summarize
+from .config import OverlayConfig
+from .state import OverlaySnapshot, SharedOverlayState
+
+
+def _build_window(config: OverlayConfig, state: SharedOverlayState):
+    from .overlay import OverlayWindow
+
+    class CountingOverlay(OverlayWindow):
+        # Records every render with the version it showed and when.
+        def __init__(self, *args, **kwargs) -> None:
+            self.renders: List[int] = []
+            self.rendered_at: Dict[int, float] = {}
+            super().__init__(*args, **kwargs)
+
+        def update_from_snapshot(self, snapshot: OverlaySnapshot) -> None:
+            self.renders.append(snapshot.version)
+            self.rendered_at[snapshot.version] = time.perf_counter()
+            super().update_from_snapshot(snapshot)
+
+    return CountingOverlay(config, state)
+
+
+def _pump(app, until: Callable[[], bool], timeout_sec: float = 2.0) -> bool:
+    from PySide6 import QtCore
+
+    deadline = time.perf_counter() + timeout_sec
+    while not until():
+        if time.perf_counter() > deadline:
+            return False
+        app.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 20)
+    return True
+
+
+def _binding_keeps_refcounts() -> bool:
+    # Some PySide6 builds drop a reference to None on every call that
+    # returns nothing, which eventually aborts the interpreter; the checks
+    # below would only crash on them.
+    from PySide6 import QtWidgets
+
+    label = QtWidgets.QLabel()
+    before = sys.getrefcount(None)
+    for _ in range(100):
+        label.setText("")
+    return sys.getrefcount(None) > before - 50
+
+
+def _in_thread(target: Callable[[], None]) -> None:
+    thread = threading.Thread(target=target, name="overlay-bench-update", daemon=True)
+    thread.start()
+    thread.join()
+
+
+def run_overlay_check(args: argparse.Namespace) -> Dict[str, object]:
+    # Offscreen unless the caller picked a platform, so it runs headless.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import PySide6
+    from PySide6 import QtWidgets
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    report: Dict[str, object] = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "platform": app.platformName(),
+        "pyside": PySide6.__version__,
+        "config": {key: value for key, value in sorted(vars(args).items()) if key != "output"},
+    }
+    checks: Dict[str, bool] = {"binding_refcounts": _binding_keeps_refcounts()}
+    if not checks["binding_refcounts"]:
+        return {**report, "checks": checks, "passed": False}
+
+    state = SharedOverlayState()
+    window = _build_window(OverlayConfig(show_source=True), state)
+
+    # One render per version bump: each update from another thread is
+    # rendered exactly once, and a second look at the same version is not.
+    steps_ok = True
+    for index in range(1, 6):
+        before = len(window.renders)
+        _in_thread(lambda: state.show_source(index, f"line {index}"))
+        rendered = _pump(app, lambda: window.rendered_version == state.version)
+        window.on_state_changed()
+        app.processEvents()
+        steps_ok = steps_ok and rendered and len(window.renders) == before + 1
+    checks["one_render_per_version"] = steps_ok
+
+    # No render when nothing changed: the same text again does not bump the
+    # version, and a stray wake-up with no new version renders nothing.
+    before = len(window.renders)
+    version = state.version
+    _in_thread(lambda: state.show_source(5, "line 5"))
+    window.on_state_changed()
+    _pump(app, lambda: False, timeout_sec=0.1)
+    checks["no_render_without_change"] = state.version == version and len(window.renders) == before
+
+    # A typewriter preview replaces a line, the line's translation lands
+    # behind it, then the preview is withdrawn: the translation must show,
+    # not the pending source.
+    def preview_then_withdraw() -> None:
+        state.show_source(50, "Hello world")
+        state.show_source(51, "Hel")
+        state.show_translation(50, "Hello world", "translated hello")
+        state.withdraw(51)
+
+    _in_thread(preview_then_withdraw)
+    _pump(app, lambda: window.rendered_version == state.version)
+    snapshot = state.get_snapshot()
+    checks["withdraw_restores_translation"] = (
+        snapshot.line_id == 50 and not snapshot.pending and "translated hello" in window.rendered_text
+    )
+
+    # Burst from a pipeline-like thread while the GUI thread keeps running:
+    # renders never outnumber version bumps and the last one is shown.
+    before = len(window.renders)
+    start_version = state.version
+    updated_at: Dict[int, float] = {}
+    interval = args.interval_ms / 1000.0
+
+    def burst() -> None:
+        for index in range(args.updates):
+            line_id = 100 + index
+            state.show_source(line_id, f"source {index}")
+            updated_at[state.version] = time.perf_counter()
+            state.show_translation(line_id, f"source {index}", f"translated {index}")
+            updated_at[state.version] = time.perf_counter()
+            if interval:
+                time.sleep(interval)
+
+    thread = threading.Thread(target=burst, name="overlay-bench-burst", daemon=True)
+    thread.start()
+    _pump(app, lambda: not thread.is_alive() and window.rendered_version == state.version, timeout_sec=30.0)
+    thread.join()
+    bumps = state.version - start_version
+    burst_renders = window.renders[before:]
+    last = args.updates - 1
+    checks["burst_renders_latest"] = (
+        window.rendered_version == state.version
+        and f"translated {last}" in window.rendered_text
+        and len(burst_renders) <= bumps
+        and burst_renders == sorted(set(burst_renders))
+    )
+
+    latencies = [
+        window.rendered_at[version] - updated_at[version]
+        for version in burst_renders
+        if version in updated_at and window.rendered_at[version] >= updated_at[version]
+    ]
+
+    window.detach()
+    window.close()
+    return {
+        **report,
+        "checks": checks,
+        "passed": all(checks.values()),
+        "burst": {
+            "version_bumps": bumps,
+            "renders": len(burst_renders),
+            "update_to_render": summarize(latencies),
+        },
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py bench overlay",
+        description="Check overlay rendering against cross-thread state updates on an offscreen Qt platform",
+    )
+    parser.add_argument("--updates", type=int, default=200, help="Lines pushed in the burst check")
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Pause between burst lines")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here as well")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    report = run_overlay_check(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            fp.write(text)
+            fp.write("\n")
+    print(text)
+    return 0 if report["passed"] else 1
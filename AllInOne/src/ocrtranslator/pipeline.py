@@ -2,44 +2,125 @@ from __future__ import annotations
 
 import threading
 import time
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Union
 
-from .capture import CaptureWorker
-from .config import OCRConfig
+from .capture import CapturedFrame, CaptureWorker
+from .change_detector import FrameChangeDetector
+from .config import CaptureConfig, OCRConfig, RegionConfig
 from .logger import TranscriptLogger
 from .ocr_engine import OCRProcessor
-from .roi import Rect, clamp_roi, crop
+from .roi import Rect
+from .scheduler import OCRScheduler, build_scheduler
+from .sources import FrameSource
 from .state import SharedOverlayState
-from .text_filter import TextDeduplicator
+from .text_filter import TextDeduplicator, TypewriterStabilizer
+from .translation_stage import TranslationJob, TranslationStage
 from .translator import BaseTranslator
 
 
+@dataclass(frozen=True)
+class PipelineResult:
+    kind: str
+    source_text: str
+    translated_text: str
+    region: Optional[str] = None
+    stale: bool = False
+    timestamp: float = 0.0
+    # Source and translation results of the same line share the ID.
+    line_id: int = 0
+    # Seconds per stage for the line: ocr, translate_wait, translate and
+    # end_to_end (frame capture to translated text).
+    latency: Dict[str, float] = field(default_factory=dict)
+
+
+StageHook = Callable[[str, float], None]
+ResultHook = Callable[[PipelineResult], None]
+
+# Upper bound on one wait for a new frame, so stop() is noticed promptly.
+_FRAME_WAIT_SEC = 0.25
+
+
+class _RegionTracker:
+    def __init__(self, region: RegionConfig, ocr_config: OCRConfig, label: Optional[str]) -> None:
+        self.region = region
+        self.label = label
+        self.dedupe = TextDeduplicator(similarity_threshold=0.93, min_interval_sec=0.15)
+        self.change_detector: Optional[FrameChangeDetector] = None
+        if ocr_config.change_gate:
+            self.change_detector = FrameChangeDetector(
+                pixel_delta=ocr_config.change_pixel_delta,
+                min_changed_ratio=ocr_config.change_min_ratio,
+            )
+        # Capture time and OCR duration of the latest reading, carried with
+        # the line into translation for latency reporting.
+        self.captured_at = 0.0
+        self.ocr_sec = 0.0
+        # Line ID claimed by a typewriter preview that is still on screen.
+        self.preview_line = 0
+        self.stabilizer: Optional[TypewriterStabilizer] = None
+        if ocr_config.typewriter_settle_sec > 0:
+            self.stabilizer = TypewriterStabilizer(settle_sec=ocr_config.typewriter_settle_sec)
+
+
 class PipelineWorker:
     def __init__(
         self,
-        capture: CaptureWorker,
+        capture: Union[CaptureWorker, FrameSource],
         ocr: OCRProcessor,
         translator: BaseTranslator,
         state: SharedOverlayState,
-        roi: Rect,
+        roi: Optional[Rect],
         ocr_config: OCRConfig,
         logger: Optional[TranscriptLogger] = None,
+        stage_hook: Optional[StageHook] = None,
+        translation_queue_size: int = 4,
+        regions: Sequence[RegionConfig] = (),
+        result_hook: Optional[ResultHook] = None,
     ) -> None:
+        # A bare frame source gets its own capture worker, owned by the pipeline.
+        self._owns_capture = isinstance(capture, FrameSource)
+        if isinstance(capture, FrameSource):
+            capture = CaptureWorker(CaptureConfig(), source=capture)
         self._capture = capture
         self._ocr = ocr
-        self._translator = translator
+        self._translation = TranslationStage(
+            translator,
+            on_result=self._on_translated,
+            on_dropped=self._on_translation_dropped,
+            max_pending=translation_queue_size,
+        )
         self._state = state
-        self._roi = roi
         self._ocr_config = ocr_config
         self._logger = logger
+        self._stage_hook = stage_hook
+        self._result_hook = result_hook
 
-        self._dedupe = TextDeduplicator(similarity_threshold=0.93, min_interval_sec=0.15)
+        if not regions:
+            if roi is None:
+                raise ValueError("PipelineWorker needs a roi or at least one region")
+            regions = (RegionConfig(name="dialogue", rect=roi),)
+        # Region names only show up in the overlay and transcript when there
+        # is more than one, so single-ROI output is unchanged.
+        multi = len(regions) > 1
+        self._regions = [
+            _RegionTracker(region, ocr_config, region.name if multi else None) for region in regions
+        ]
+        self._scheduler = build_scheduler(ocr_config)
+        self.ocr_calls = 0
+        self.ocr_failures = 0
+        self._last_seq = 0
+        # Overlay and result line IDs; allocated on the pipeline thread only.
+        self._line_id = 0
         self._stop_event = threading.Event()
         self._thread: threading.Thread | None = None
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
             return
+        if self._owns_capture:
+            self._capture.start()
+        self._translation.start()
         self._thread = threading.Thread(target=self._run, name="pipeline-worker", daemon=True)
         self._thread.start()
 
@@ -47,33 +128,265 @@ class PipelineWorker:
         self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=2.0)
+        self._translation.stop()
+        if self._owns_capture:
+            self._capture.stop()
+
+    @property
+    def capture(self) -> CaptureWorker:
+        return self._capture
+
+    @property
+    def translation(self) -> TranslationStage:
+        return self._translation
+
+    @property
+    def scheduler(self) -> OCRScheduler:
+        return self._scheduler
+
+    @property
+    def ocr_skipped(self) -> int:
+        return sum(
+            tracker.change_detector.frames_skipped
+            for tracker in self._regions
+            if tracker.change_detector is not None
+        )
+
+    @property
+    def idle(self) -> bool:
+        # Every captured frame has been read and nothing is held or waiting
+        # for translation; used to tell when a finite source is done.
+        return (
+            self._last_seq >= self._capture.latest_seq
+            and self._next_release() is None
+            and self._translation.idle
+        )
+
+    @property
+    def dedupe_suppressed(self) -> int:
+        return sum(tracker.dedupe.suppressed for tracker in self._regions)
 
     def _run(self) -> None:
         last_tick = 0.0
+        last_seq = 0
+        rects = [tracker.region.rect for tracker in self._regions]
 
         while not self._stop_event.is_set():
+            # Sleep until the scheduler's next slot, but no later than a held
+            # typewriter line is due for release.
             now = time.monotonic()
-            elapsed = now - last_tick
-            if elapsed < self._ocr_config.ocr_interval_sec:
-                time.sleep(max(0.01, self._ocr_config.ocr_interval_sec - elapsed))
+            wake_at = last_tick + self._scheduler.interval
+            release_at = self._next_release()
+            if release_at is not None and release_at < wake_at:
+                if release_at <= now:
+                    self._poll_stabilizers(self._regions)
+                    continue
+                self._stop_event.wait(release_at - now)
+                continue
+            if wake_at > now:
+                self._stop_event.wait(wake_at - now)
                 continue
-            last_tick = now
 
-            frame = self._capture.get_latest_frame()
-            if frame is None:
-                time.sleep(0.02)
+            # Then wait for a frame we have not looked at yet instead of polling.
+            timeout = _FRAME_WAIT_SEC
+            if release_at is not None:
+                timeout = min(timeout, max(0.0, release_at - now))
+            if self._capture.wait_for_frame(last_seq, timeout=timeout) <= last_seq:
+                self._poll_stabilizers(self._regions)
+                if self._capture.finished:
+                    self._stop_event.wait(_FRAME_WAIT_SEC)
                 continue
+            last_tick = time.monotonic()
 
-            roi = clamp_roi(self._roi, frame)
-            dialogue_img = crop(frame, roi)
-            source_text = self._ocr.recognize(dialogue_img)
-            if not self._dedupe.should_emit(source_text):
+            frames = self._capture.get_latest_rois(rects, since_seq=last_seq)
+            if frames is None:
                 continue
+            last_seq = frames[0].seq
+            try:
+                self._process(frames, last_tick)
+            finally:
+                # Marked handled only now: idle must stay false while OCR
+                # and translation submission for this frame are in progress.
+                self._last_seq = last_seq
+
+    def _process(self, frames: List[CapturedFrame], last_tick: float) -> None:
+        self._record("frame_age", time.monotonic() - frames[0].timestamp)
+
+        changed: List[_RegionTracker] = []
+        images = []
+        started = time.perf_counter()
+        for tracker, frame in zip(self._regions, frames):
+            detector = tracker.change_detector
+            if detector is None or detector.has_changed(frame.image):
+                changed.append(tracker)
+                images.append(frame.image)
+        if any(tracker.change_detector is not None for tracker in self._regions):
+            self._record("change_gate", time.perf_counter() - started)
+
+        self._scheduler.observe(bool(changed), last_tick)
+        self._record("schedule_interval", self._scheduler.interval)
+        self._poll_stabilizers([tracker for tracker in self._regions if tracker not in changed])
+        if not changed:
+            return
+
+        self.ocr_calls += 1
+        started = time.perf_counter()
+        try:
+            texts = self._ocr.recognize_many(images, [tracker.region.threshold for tracker in changed])
+        except Exception as exc:
+            self.ocr_failures += 1
+            print(f"OCR failed: {exc}")
+            # Forget the baseline so these regions are read again next tick.
+            for tracker in changed:
+                if tracker.change_detector is not None:
+                    tracker.change_detector.reset()
+            return
+        ocr_sec = time.perf_counter() - started
+        self._record("ocr", ocr_sec)
+        for stage, seconds in getattr(self._ocr, "last_timings", {}).items():
+            self._record(f"ocr.{stage}", seconds)
+
+        for tracker, source_text in zip(changed, texts):
+            tracker.captured_at = frames[0].timestamp
+            tracker.ocr_sec = ocr_sec
+            self._observe(tracker, source_text)
+
+    def _observe(self, tracker: _RegionTracker, source_text: str) -> None:
+        if tracker.stabilizer is None:
+            self._emit(tracker, source_text)
+            return
+
+        stable = tracker.stabilizer.observe(source_text)
+        if stable is not None:
+            self._emit(tracker, stable)
+        elif self._ocr_config.typewriter_preview and tracker.stabilizer.pending:
+            pending = tracker.stabilizer.pending
+            # The settled line keeps the ID its preview claimed.
+            if not tracker.preview_line:
+                tracker.preview_line = self._next_line_id()
+            self._state.show_source(tracker.preview_line, pending, region=tracker.label)
+            self._publish(
+                PipelineResult(
+                    kind="preview",
+                    source_text=pending,
+                    translated_text=pending,
+                    region=tracker.label,
+                    timestamp=time.time(),
+                    line_id=tracker.preview_line,
+                )
+            )
+
+    def _next_release(self) -> Optional[float]:
+        times = [
+            tracker.stabilizer.release_at
+            for tracker in self._regions
+            if tracker.stabilizer is not None and tracker.stabilizer.release_at is not None
+        ]
+        return min(times) if times else None
+
+    def _poll_stabilizers(self, trackers: Sequence[_RegionTracker]) -> None:
+        for tracker in trackers:
+            if tracker.stabilizer is None:
+                continue
+            stable = tracker.stabilizer.poll()
+            if stable is not None:
+                self._emit(tracker, stable)
+
+    def _emit(self, tracker: _RegionTracker, source_text: str) -> None:
+        preview_line, tracker.preview_line = tracker.preview_line, 0
+        if not tracker.dedupe.should_emit(source_text):
+            if preview_line:
+                # Nothing will be translated for the preview; put back the
+                # line it covered.
+                self._state.withdraw(preview_line, region=tracker.label)
+            return
+        # The recognized text goes up before the request is queued; the
+        # translation replaces it unless a newer line got there first.
+        line_id = preview_line or self._next_line_id()
+        self._state.show_source(line_id, source_text, region=tracker.label)
+        latency = {"ocr": tracker.ocr_sec}
+        if tracker.captured_at:
+            latency["end_to_end"] = time.monotonic() - tracker.captured_at
+        self._publish(
+            PipelineResult(
+                kind="source",
+                source_text=source_text,
+                translated_text="",
+                region=tracker.label,
+                timestamp=time.time(),
+                latency=latency,
+                line_id=line_id,
+            )
+        )
+        self._translation.submit(
+            source_text,
+            key=tracker.label or "",
+            captured_at=tracker.captured_at,
+            ocr_sec=tracker.ocr_sec,
+            line_id=line_id,
+        )
+
+    def _next_line_id(self) -> int:
+        self._line_id += 1
+        return self._line_id
+
+    def _on_translated(self, job: TranslationJob, translated: str, is_stale: bool) -> None:
+        self._record("translate_wait", job.started_at - job.submitted_at)
+        self._record("translate", job.finished_at - job.started_at)
+
+        # A stale result belongs to a line the overlay has already replaced,
+        # so the state ignores it.
+        started = time.perf_counter()
+        region = job.key or None
+        self._state.show_translation(job.line_id, job.source_text, translated, region=region)
+        self._record("state_update", time.perf_counter() - started)
+        self._log(job.source_text, translated, region)
+        if self._result_hook is not None:
+            latency = {
+                "ocr": job.ocr_sec,
+                "translate_wait": job.started_at - job.submitted_at,
+                "translate": job.finished_at - job.started_at,
+            }
+            if job.captured_at:
+                latency["end_to_end"] = job.finished_at - job.captured_at
+            self._publish(
+                PipelineResult(
+                    kind="translation",
+                    source_text=job.source_text,
+                    translated_text=translated,
+                    region=region,
+                    stale=is_stale,
+                    timestamp=time.time(),
+                    latency=latency,
+                    line_id=job.line_id,
+                )
+            )
+
+    def _on_translation_dropped(self, job: TranslationJob) -> None:
+        # Superseded lines are still written to the transcript, untranslated.
+        # A line dropped on queue overflow may still be the newest of its
+        # region; it settles with its source text instead of staying pending.
+        self._state.show_translation(job.line_id, job.source_text, job.source_text, region=job.key or None)
+        self._log(job.source_text, "", job.key or None)
+
+    def _log(self, source_text: str, translated_text: str, region: Optional[str]) -> None:
+        if self._logger is None:
+            return
+        started = time.perf_counter()
+        try:
+            self._logger.log(source_text=source_text, translated_text=translated_text, region=region)
+        except Exception as exc:
+            print(f"Log write failed: {exc}")
+        self._record("log", time.perf_counter() - started)
+
+    def _publish(self, result: PipelineResult) -> None:
+        if self._result_hook is None:
+            return
+        try:
+            self._result_hook(result)
+        except Exception as exc:
+            print(f"Result sink failed: {exc}")
 
-            translated = self._translator.translate(source_text)
-            self._state.update(source_text=source_text, translated_text=translated)
-            if self._logger is not None:
-                try:
-                    self._logger.log(source_text=source_text, translated_text=translated)
-                except Exception as exc:
-                    print(f"Log write failed: {exc}")
+    def _record(self, stage: str, seconds: float) -> None:
+        if self._stage_hook is not None:
+            self._stage_hook(stage, seconds)
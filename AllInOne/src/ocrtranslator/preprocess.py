@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .config import OCRConfig
+
+DEFAULT_STEPS: Tuple[str, ...] = ("gray", "upscale", "threshold", "median")
+
+_INTERPOLATION = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "area": cv2.INTER_AREA,
+    "cubic": cv2.INTER_CUBIC,
+}
+
+_STEPS = {"gray", "upscale", "threshold", "lut", "otsu", "adaptive", "median"}
+_NEEDS_GRAY = {"otsu", "adaptive"}
+
+
+def parse_steps(value: Optional[str]) -> Tuple[str, ...]:
+    if not value:
+        return DEFAULT_STEPS
+    steps = tuple(part.strip().lower() for part in value.split(",") if part.strip())
+    validate_steps(steps)
+    return steps
+
+
+def validate_steps(steps: Sequence[str]) -> None:
+    seen_gray = False
+    for step in steps:
+        if step not in _STEPS:
+            raise ValueError(f"Unknown preprocess step: {step} (choose from {', '.join(sorted(_STEPS))})")
+        if step in _NEEDS_GRAY and not seen_gray:
+            raise ValueError(f"Preprocess step '{step}' needs 'gray' earlier in the chain")
+        seen_gray = seen_gray or step == "gray"
+
+
+class Preprocessor:
+    def __init__(
+        self,
+        steps: Sequence[str] = DEFAULT_STEPS,
+        pre_scale: float = 2.0,
+        threshold: int = 170,
+        interpolation: str = "cubic",
+        adaptive_block_size: int = 31,
+        adaptive_c: float = 10.0,
+        median_ksize: int = 3,
+    ) -> None:
+        validate_steps(steps)
+        if interpolation not in _INTERPOLATION:
+            raise ValueError(f"Unknown interpolation: {interpolation}")
+
+        self._steps = tuple(steps)
+        self._pre_scale = pre_scale
+        self._threshold = threshold
+        self._interpolation = _INTERPOLATION[interpolation]
+        self._adaptive_block_size = adaptive_block_size | 1
+        self._adaptive_c = adaptive_c
+        self._median_ksize = median_ksize | 1
+        # Same semantics as cv2.THRESH_BINARY: 255 where value > threshold.
+        self._lut = np.where(np.arange(256) > threshold, 255, 0).astype(np.uint8)
+        self._buffers: Dict[int, np.ndarray] = {}
+        self.last_timings: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, config: OCRConfig, threshold: Optional[int] = None) -> "Preprocessor":
+        return cls(
+            steps=config.preprocess,
+            pre_scale=config.pre_scale,
+            threshold=config.threshold if threshold is None else threshold,
+            interpolation=config.interpolation,
+            adaptive_block_size=config.adaptive_block_size,
+            adaptive_c=config.adaptive_c,
+        )
+
+    @property
+    def steps(self) -> Tuple[str, ...]:
+        return self._steps
+
+    def run(self, frame: np.ndarray) -> np.ndarray:
+        # The returned array is an internal buffer that the next call reuses;
+        # copy it if it has to outlive the current OCR pass.
+        timings: Dict[str, float] = {}
+        image = frame
+        for index, step in enumerate(self._steps):
+            started = time.perf_counter()
+            image = self._apply(index, step, image)
+            timings[step] = timings.get(step, 0.0) + time.perf_counter() - started
+        self.last_timings = timings
+        return image
+
+    def _apply(self, index: int, step: str, src: np.ndarray) -> np.ndarray:
+        if step == "gray":
+            if src.ndim == 2:
+                return src
+            return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=self._buffer(index, src.shape[:2]))
+
+        if step == "upscale":
+            if self._pre_scale <= 1.0:
+                return src
+            # Scale factors, not an explicit size: OpenCV maps pixels with
+            # 1/fx when it is given, which differs from w/dsize at scales
+            # like 2.2. The buffer is sized the way OpenCV rounds (cvRound).
+            h, w = src.shape[:2]
+            dst = self._buffer(index, (round(h * self._pre_scale), round(w * self._pre_scale)) + src.shape[2:])
+            return cv2.resize(
+                src,
+                (0, 0),
+                dst=dst,
+                fx=self._pre_scale,
+                fy=self._pre_scale,
+                interpolation=self._interpolation,
+            )
+
+        dst = self._buffer(index, src.shape)
+        if step == "threshold":
+            _, out = cv2.threshold(src, self._threshold, 255, cv2.THRESH_BINARY, dst=dst)
+            return out
+        if step == "lut":
+            return cv2.LUT(src, self._lut, dst=dst)
+        if step == "otsu":
+            _, out = cv2.threshold(src, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=dst)
+            return out
+        if step == "adaptive":
+            return cv2.adaptiveThreshold(
+                src,
+                255,
+                cv2.ADAPTIVE_THRESH_MEAN_C,
+                cv2.THRESH_BINARY,
+                self._adaptive_block_size,
+                self._adaptive_c,
+                dst=dst,
+            )
+        if step == "median":
+            return cv2.medianBlur(src, self._median_ksize, dst=dst)
+
+        raise ValueError(f"Unknown preprocess step: {step}")
+
+    def _buffer(self, index: int, shape: Tuple[int, ...]) -> np.ndarray:
+        buffer = self._buffers.get(index)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._buffers[index] = buffer
+        return buffer
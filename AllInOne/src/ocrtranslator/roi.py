@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 
 import cv2
 import numpy as np
 
-Rect = Tuple[int, int, int, int]
+from .config import Rect, RegionConfig
 
 
 def parse_roi(value: Optional[str]) -> Optional[Rect]:
@@ -20,6 +20,31 @@ def parse_roi(value: Optional[str]) -> Optional[Rect]:
     return x, y, w, h
 
 
+def parse_region(value: str) -> RegionConfig:
+    name, sep, spec = value.partition("=")
+    name = name.strip()
+    if not sep or not name:
+        raise ValueError("Region must be formatted as name=x,y,w,h[@threshold]")
+
+    rect_spec, _, threshold = spec.partition("@")
+    rect = parse_roi(rect_spec)
+    if rect is None:
+        raise ValueError("Region must be formatted as name=x,y,w,h[@threshold]")
+    return RegionConfig(
+        name=name,
+        rect=rect,
+        threshold=int(threshold) if threshold.strip() else None,
+    )
+
+
+def parse_regions(values: Iterable[str]) -> Tuple[RegionConfig, ...]:
+    regions = tuple(parse_region(value) for value in values)
+    names = [region.name for region in regions]
+    if len(set(names)) != len(names):
+        raise ValueError("Region names must be unique")
+    return regions
+
+
 def clamp_roi(roi: Rect, frame: np.ndarray) -> Rect:
     fh, fw = frame.shape[:2]
     x, y, w, h = roi
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .config import OCRConfig
+
+
+class OCRScheduler:
+    @property
+    def interval(self) -> float:
+        raise NotImplementedError
+
+    def observe(self, changed: bool, now: float) -> None:
+        return
+
+
+@dataclass
+class FixedScheduler(OCRScheduler):
+    interval_sec: float = 0.35
+
+    @property
+    def interval(self) -> float:
+        return self.interval_sec
+
+
+@dataclass
+class AdaptiveScheduler(OCRScheduler):
+    min_rate_hz: float = 3.0
+    max_rate_hz: float = 10.0
+    burst_sec: float = 1.5
+    backoff: float = 1.5
+
+    def __post_init__(self) -> None:
+        if self.min_rate_hz <= 0 or self.max_rate_hz < self.min_rate_hz:
+            raise ValueError("Scheduler rates need 0 < min_rate_hz <= max_rate_hz")
+        self._fastest = 1.0 / self.max_rate_hz
+        self._slowest = 1.0 / self.min_rate_hz
+        self._interval = self._fastest
+        self._burst_until = 0.0
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def observe(self, changed: bool, now: float) -> None:
+        if changed:
+            # Dialogue tends to keep moving once it starts: stay at the top
+            # rate for a while before backing off.
+            self._interval = self._fastest
+            self._burst_until = now + self.burst_sec
+        elif now >= self._burst_until:
+            self._interval = min(self._interval * self.backoff, self._slowest)
+
+
+def build_scheduler(config: OCRConfig) -> OCRScheduler:
+    kind = config.scheduler.lower()
+    if kind == "fixed":
+        return FixedScheduler(config.ocr_interval_sec)
+    if kind == "adaptive":
+        return AdaptiveScheduler(
+            min_rate_hz=config.min_rate_hz,
+            max_rate_hz=config.max_rate_hz,
+            burst_sec=config.burst_sec,
+        )
+    raise ValueError(f"Unknown OCR scheduler: {config.scheduler}")
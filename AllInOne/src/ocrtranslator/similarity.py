@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict
+
+# How many characters to scan between bound checks in may_be_similar.
+_CHECK_EVERY = 8
+
+try:
+    _bit_count = int.bit_count
+except AttributeError:  # Python < 3.10
+
+    def _bit_count(value: int) -> int:
+        return bin(value).count("1")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _match_masks(text: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for index, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << index)
+    return masks
+
+
+def lcs_length(a: str, b: str) -> int:
+    # Bit-parallel LCS (Allison-Dix / Hyyro): one pass over the shorter
+    # string with the longer one packed into the bits of a Python int.
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return 0
+    masks = _match_masks(a)
+    full = (1 << len(a)) - 1
+    row = full
+    for char in b:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a) - _bit_count(row)
+
+
+def similarity_ratio(a: str, b: str) -> float:
+    # difflib.SequenceMatcher's ratio, the metric the dedupe, typewriter and
+    # log-window thresholds were tuned with.
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def is_similar(a: str, b: str, threshold: float) -> bool:
+    # Same answer as similarity_ratio(a, b) >= threshold; most dissimilar
+    # pairs are rejected by the bounded LCS before SequenceMatcher runs.
+    if a == b:
+        return True
+    if not may_be_similar(a, b, threshold):
+        return False
+    return SequenceMatcher(None, a, b).ratio() >= threshold
+
+
+def may_be_similar(a: str, b: str, threshold: float) -> bool:
+    # False only when similarity_ratio(a, b) < threshold for sure:
+    # SequenceMatcher's matching blocks are a common subsequence, so
+    # 2*LCS/(len a + len b) bounds its ratio from above. Stops as soon as the
+    # LCS is known to be long enough or too short.
+    total = len(a) + len(b)
+    if total == 0 or a == b:
+        return True
+    needed = math.ceil(threshold * total / 2.0 - 1e-9)
+    if min(len(a), len(b)) < needed:
+        return False
+    if needed <= 0:
+        return True
+
+    if len(a) < len(b):
+        a, b = b, a
+    masks = _match_masks(a)
+    full = (1 << len(a)) - 1
+    row = full
+    remaining = len(b)
+    for index, char in enumerate(b, 1):
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+        if index % _CHECK_EVERY == 0 or index == remaining:
+            common = len(a) - _bit_count(row)
+            if common >= needed:
+                return True
+            # Each remaining character adds at most one to the LCS.
+            if common + remaining - index < needed:
+                return False
+    return False
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, TextIO
+
+from .pipeline import PipelineResult
+
+
+def result_to_dict(result: PipelineResult) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "type": result.kind,
+        "timestamp": datetime.fromtimestamp(result.timestamp).isoformat(timespec="milliseconds"),
+        "source_text": result.source_text,
+        "translated_text": result.translated_text,
+    }
+    if result.line_id:
+        payload["line_id"] = result.line_id
+    if result.region is not None:
+        payload["region"] = result.region
+    if result.stale:
+        payload["stale"] = True
+    if result.latency:
+        payload["latency_ms"] = {stage: round(seconds * 1000.0, 2) for stage, seconds in result.latency.items()}
+    return payload
+
+
+def encode_result(result: PipelineResult) -> str:
+    return json.dumps(result_to_dict(result), ensure_ascii=False) + "\n"
+
+
+class ResultSink:
+    def emit(self, result: PipelineResult) -> None:
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return type(self).__name__
+
+    def close(self) -> None:
+        return
+
+
+class StreamSink(ResultSink):
+    def __init__(self, stream: TextIO, name: str = "stdout") -> None:
+        self._stream = stream
+        self._name = name
+        self._lock = threading.Lock()
+
+    def emit(self, result: PipelineResult) -> None:
+        line = encode_result(result)
+        with self._lock:
+            self._stream.write(line)
+            self._stream.flush()
+
+    def describe(self) -> str:
+        return self._name
+
+
+class FileSink(ResultSink):
+    def __init__(self, path: str) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Line buffered, so a reader tailing the file sees each result at once.
+        self._fp = self._path.open("a", encoding="utf-8", buffering=1)
+
+    def emit(self, result: PipelineResult) -> None:
+        line = encode_result(result)
+        with self._lock:
+            self._fp.write(line)
+
+    def describe(self) -> str:
+        return f"file:{self._path}"
+
+    def close(self) -> None:
+        with self._lock:
+            self._fp.close()
+
+
+_CLIENT_CLOSE = None
+
+
+class _Client:
+    def __init__(self, conn: socket.socket, address: Any, backlog: int) -> None:
+        self.conn = conn
+        self.address = address
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=backlog)
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name=f"sink-client-{address}", daemon=True)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                data = self.queue.get()
+                if data is _CLIENT_CLOSE:
+                    break
+                self.conn.sendall(data)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+
+
+class TCPBroadcastSink(ResultSink):
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, backlog: int = 256) -> None:
+        self._backlog = max(1, backlog)
+        self._server = socket.create_server((host, port))
+        self._server.settimeout(0.25)
+        self._lock = threading.Lock()
+        self._clients: List[_Client] = []
+        self._last: Optional[bytes] = None
+        self._stop_event = threading.Event()
+        self.dropped_clients = 0
+        self._thread = threading.Thread(target=self._accept, name="sink-tcp-accept", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Any:
+        return self._server.getsockname()
+
+    @property
+    def clients(self) -> int:
+        with self._lock:
+            return sum(1 for client in self._clients if not client.closed)
+
+    def emit(self, result: PipelineResult) -> None:
+        # Each client has its own sender thread and queue, so a slow
+        # renderer is disconnected instead of stalling the pipeline.
+        data = encode_result(result).encode("utf-8")
+        with self._lock:
+            self._last = data
+            clients = list(self._clients)
+        for client in clients:
+            if client.closed:
+                continue
+            try:
+                client.queue.put_nowait(data)
+            except queue.Full:
+                self._disconnect(client)
+
+    def describe(self) -> str:
+        host, port = self.address[:2]
+        return f"tcp:{host}:{port}"
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout=2.0)
+        self._server.close()
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for client in clients:
+            self._shutdown(client)
+        for client in clients:
+            client.thread.join(timeout=1.0)
+
+    def _accept(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                conn, address = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            client = _Client(conn, address, self._backlog)
+            with self._lock:
+                self._clients = [item for item in self._clients if not item.closed]
+                self._clients.append(client)
+                # A renderer that connects late starts from the current text.
+                if self._last is not None:
+                    client.queue.put_nowait(self._last)
+            client.thread.start()
+
+    def _disconnect(self, client: _Client) -> None:
+        self.dropped_clients += 1
+        print(f"Result sink client {client.address} is too slow; disconnecting")
+        self._shutdown(client)
+
+    @staticmethod
+    def _shutdown(client: _Client) -> None:
+        client.closed = True
+        try:
+            client.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            client.queue.put_nowait(_CLIENT_CLOSE)
+        except queue.Full:
+            pass
+
+
+class SinkGroup(ResultSink):
+    def __init__(self, sinks: Sequence[ResultSink]) -> None:
+        self._sinks = list(sinks)
+
+    @property
+    def sinks(self) -> List[ResultSink]:
+        return list(self._sinks)
+
+    def emit(self, result: PipelineResult) -> None:
+        for sink in self._sinks:
+            try:
+                sink.emit(result)
+            except Exception as exc:
+                print(f"Result sink {sink.describe()} failed: {exc}")
+
+    def describe(self) -> str:
+        return ",".join(sink.describe() for sink in self._sinks)
+
+    def close(self) -> None:
+        for sink in self._sinks:
+            sink.close()
+
+
+def parse_sink(spec: str, stdout: Optional[TextIO] = None) -> ResultSink:
+    # stdout | file:<path> | tcp:<port> | tcp:<host>:<port>
+    kind, _, rest = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind == "stdout" and not rest:
+        return StreamSink(stdout or sys.stdout)
+    if kind == "file" and rest:
+        return FileSink(rest)
+    if kind == "tcp" and rest:
+        host, _, port = rest.rpartition(":")
+        try:
+            return TCPBroadcastSink(host or "127.0.0.1", int(port))
+        except ValueError as exc:
+            raise ValueError(f"Invalid TCP sink port: {spec}") from exc
+    raise ValueError(f"Unknown result sink: {spec} (use stdout, file:<path> or tcp:[host:]port)")
+
+
+def build_sinks(specs: Sequence[str], stdout: Optional[TextIO] = None) -> SinkGroup:
+    sinks: List[ResultSink] = []
+    try:
+        for spec in specs:
+            sinks.append(parse_sink(spec, stdout=stdout))
+    except Exception:
+        for sink in sinks:
+            sink.close()
+        raise
+    return SinkGroup(sinks)
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import platform
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .config import CaptureConfig
+
+ReadResult = Tuple[bool, Optional[np.ndarray]]
+
+_DEFAULT_SYNTHETIC_LINES = (
+    "Hello! Welcome to the world of monsters.",
+    "My name is Professor Oak.",
+    "This world is inhabited by creatures",
+    "that we call monsters.",
+    "Tell me, are you a boy or a girl?",
+)
+
+
+class FrameSource:
+    fps: float = 30.0
+    # Sources that can take a frame without decoding it (grab) and decode the
+    # last grabbed frame later (retrieve), like cv2.VideoCapture. Capture
+    # then decodes only the frames the pipeline asks for.
+    supports_grab: bool = False
+
+    def open(self) -> None:
+        return
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        raise NotImplementedError
+
+    def grab(self) -> bool:
+        raise NotImplementedError
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        raise NotImplementedError
+
+    @property
+    def exhausted(self) -> bool:
+        return False
+
+    def release(self) -> None:
+        return
+
+    def describe(self) -> str:
+        return type(self).__name__
+
+
+class _Pacer:
+    def __init__(self, fps: float, realtime: bool) -> None:
+        self._period = 1.0 / max(fps, 1e-3)
+        self._realtime = realtime
+        self._next = 0.0
+
+    def wait(self) -> None:
+        if not self._realtime:
+            return
+        now = time.monotonic()
+        if self._next <= 0.0 or now - self._next > self._period:
+            # First frame, or we fell more than a frame behind: resync rather
+            # than bursting to catch up.
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next += self._period
+
+
+def _copy_into(image: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+    if out is not None and out.shape == image.shape and out.dtype == image.dtype:
+        np.copyto(out, image)
+        return out
+    return image.copy()
+
+
+class DeviceFrameSource(FrameSource):
+    supports_grab = True
+
+    def __init__(self, config: CaptureConfig) -> None:
+        self._config = config
+        self.fps = float(config.fps)
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._mode = ""
+
+    def open(self) -> None:
+        backend = cv2.CAP_DSHOW if platform.system() == "Windows" else 0
+        cap = cv2.VideoCapture(self._config.device_index, backend)
+        # The pixel format goes first: drivers pick the resolutions and frame
+        # rates they offer per format. MJPG moves USB capture cards off raw
+        # YUY2, which many only deliver at reduced rates at 720p and up.
+        if self._config.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self._config.fourcc.upper()))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self._config.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self._config.height)
+        cap.set(cv2.CAP_PROP_FPS, self._config.fps)
+
+        if not cap.isOpened():
+            raise RuntimeError(
+                f"Failed to open video capture device index={self._config.device_index}."
+            )
+        self._capture = cap
+        self._mode = _describe_mode(cap)
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        assert self._capture is not None
+        ok, frame = self._capture.read(out)
+        time.sleep(0.2 / max(self.fps, 1.0))
+        return ok, frame
+
+    def grab(self) -> bool:
+        assert self._capture is not None
+        ok = self._capture.grab()
+        time.sleep(0.2 / max(self.fps, 1.0))
+        return ok
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        assert self._capture is not None
+        return self._capture.retrieve(out)
+
+    def release(self) -> None:
+        if self._capture is not None:
+            self._capture.release()
+
+    def describe(self) -> str:
+        return f"device:{self._config.device_index}" + (f" ({self._mode})" if self._mode else "")
+
+
+def _describe_mode(cap: cv2.VideoCapture) -> str:
+    # What the driver actually agreed to, which may differ from the request.
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    fourcc = "".join(chr((code >> shift) & 0xFF) for shift in (0, 8, 16, 24)).strip("\0 ")
+    mode = f"{width}x{height}@{fps:g}"
+    if fourcc.isprintable() and fourcc:
+        mode += f" {fourcc}"
+    return mode
+
+
+class VideoFileSource(FrameSource):
+    supports_grab = True
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False) -> None:
+        self._path = path
+        self._realtime = realtime
+        self._loop = loop
+        # Read as fast as possible, grabbing would race through the file and
+        # skip whatever the pipeline was too slow to ask for; decoding every
+        # frame keeps such runs reproducible.
+        self.supports_grab = realtime
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._exhausted = False
+        self._pacer: Optional[_Pacer] = None
+
+    def open(self) -> None:
+        cap = cv2.VideoCapture(self._path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video file: {self._path}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._capture = cap
+        self._pacer = _Pacer(self.fps, self._realtime)
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        assert self._capture is not None and self._pacer is not None
+        if self._exhausted:
+            return False, None
+
+        self._pacer.wait()
+        ok, frame = self._capture.read(out)
+        if ok:
+            return ok, frame
+
+        if self._loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return self._capture.read(out)
+
+        self._exhausted = True
+        return False, None
+
+    def grab(self) -> bool:
+        assert self._capture is not None and self._pacer is not None
+        if self._exhausted:
+            return False
+
+        self._pacer.wait()
+        if self._capture.grab():
+            return True
+
+        if self._loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return self._capture.grab()
+
+        self._exhausted = True
+        return False
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        assert self._capture is not None
+        return self._capture.retrieve(out)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    def release(self) -> None:
+        if self._capture is not None:
+            self._capture.release()
+
+    def describe(self) -> str:
+        return f"video:{self._path}"
+
+
+class ImageSequenceSource(FrameSource):
+    def __init__(
+        self,
+        directory: str,
+        fps: float = 30.0,
+        realtime: bool = True,
+        loop: bool = False,
+        pattern: str = "*.png",
+    ) -> None:
+        self._directory = Path(directory)
+        self._pattern = pattern
+        self._realtime = realtime
+        self._loop = loop
+        self.fps = fps
+        self._paths: List[Path] = []
+        self._index = 0
+        self._pacer = _Pacer(fps, realtime)
+
+    def open(self) -> None:
+        self._paths = sorted(self._directory.glob(self._pattern))
+        if not self._paths:
+            raise RuntimeError(f"No frames matching {self._pattern} in {self._directory}")
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        if self._index >= len(self._paths):
+            if not self._loop or not self._paths:
+                return False, None
+            self._index = 0
+
+        self._pacer.wait()
+        path = self._paths[self._index]
+        self._index += 1
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            return False, None
+        return True, _copy_into(image, out)
+
+    @property
+    def exhausted(self) -> bool:
+        return not self._loop and self._index >= len(self._paths)
+
+    def describe(self) -> str:
+        return f"images:{self._directory}"
+
+
+class SyntheticTextSource(FrameSource):
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        fps: float = 30.0,
+        lines: Sequence[str] = _DEFAULT_SYNTHETIC_LINES,
+        hold_sec: float = 2.0,
+        chars_per_sec: float = 0.0,
+        realtime: bool = True,
+        loop: bool = True,
+    ) -> None:
+        if not lines:
+            raise ValueError("Synthetic source needs at least one line of text")
+        self._width = width
+        self._height = height
+        self._lines = list(lines)
+        self._hold_sec = hold_sec
+        self._chars_per_sec = chars_per_sec
+        self._realtime = realtime
+        self._loop = loop
+        self.fps = fps
+        self._pacer = _Pacer(fps, realtime)
+
+        self._frame_index = 0
+        self._rendered_text: Optional[str] = None
+        self._canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self._exhausted = False
+
+    @property
+    def current_text(self) -> Optional[str]:
+        return self._rendered_text
+
+    @property
+    def dialogue_roi(self) -> Tuple[int, int, int, int]:
+        roi_h = int(self._height * 0.28)
+        return 0, self._height - roi_h, self._width, roi_h
+
+    def read(self, out: Optional[np.ndarray] = None) -> ReadResult:
+        if self._exhausted:
+            return False, None
+
+        self._pacer.wait()
+        text = self._visible_text(self._frame_index / self.fps)
+        self._frame_index += 1
+        if text is None:
+            self._exhausted = True
+            return False, None
+
+        if text != self._rendered_text:
+            self._render(text)
+            self._rendered_text = text
+
+        return True, _copy_into(self._canvas, out)
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    def describe(self) -> str:
+        return "synthetic"
+
+    def _visible_text(self, media_sec: float) -> Optional[str]:
+        line_index = int(media_sec // self._hold_sec)
+        if line_index >= len(self._lines):
+            if not self._loop:
+                return None
+            line_index %= len(self._lines)
+
+        line = self._lines[line_index]
+        if self._chars_per_sec <= 0:
+            return line
+        elapsed = media_sec - (media_sec // self._hold_sec) * self._hold_sec
+        return line[: max(1, int(elapsed * self._chars_per_sec))]
+
+    def _render(self, text: str) -> None:
+        self._canvas[:] = (40, 90, 40)
+        x, y, w, h = self.dialogue_roi
+        cv2.rectangle(self._canvas, (x + 8, y + 8), (x + w - 8, y + h - 8), (20, 20, 20), -1)
+        scale = max(0.6, h / 160.0)
+        cv2.putText(
+            self._canvas,
+            text,
+            (x + 32, y + h // 2 + int(12 * scale)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            scale,
+            (255, 255, 255),
+            max(1, int(round(scale * 2))),
+            cv2.LINE_AA,
+        )
+
+
+def build_frame_source(config: CaptureConfig) -> FrameSource:
+    kind = config.source.lower()
+
+    if kind == "device":
+        return DeviceFrameSource(config)
+
+    if kind == "video":
+        if not config.source_path:
+            raise ValueError("Video source requires --source-path")
+        return VideoFileSource(config.source_path, realtime=config.realtime, loop=config.loop)
+
+    if kind == "images":
+        if not config.source_path:
+            raise ValueError("Image sequence source requires --source-path")
+        return ImageSequenceSource(
+            config.source_path,
+            fps=config.fps,
+            realtime=config.realtime,
+            loop=config.loop,
+        )
+
+    if kind == "synthetic":
+        lines: Sequence[str] = _DEFAULT_SYNTHETIC_LINES
+        if config.source_path:
+            text = Path(config.source_path).read_text(encoding="utf-8")
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+        return SyntheticTextSource(
+            width=config.width,
+            height=config.height,
+            fps=config.fps,
+            lines=lines,
+            realtime=config.realtime,
+            loop=config.loop,
+        )
+
+    raise ValueError(f"Unknown frame source: {config.source}")
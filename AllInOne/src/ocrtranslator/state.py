@@ -1,29 +1,141 @@
 from __future__ import annotations
 
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class RegionText:
+    source_text: str = ""
+    translated_text: str = ""
+    # Pipeline line the text belongs to; pending until its translation lands.
+    line_id: int = 0
+    pending: bool = False
 
 
 @dataclass
 class OverlaySnapshot:
     source_text: str
     translated_text: str
+    regions: Dict[str, RegionText] = field(default_factory=dict)
+    version: int = 0
+    line_id: int = 0
+    pending: bool = False
+
+
+StateListener = Callable[[int], None]
 
 
 class SharedOverlayState:
-    def __init__(self) -> None:
+    def __init__(self, region_names: Sequence[str] = ()) -> None:
         self._lock = threading.Lock()
-        self._source_text = ""
-        self._translated_text = ""
+        self._latest = RegionText()
+        # Insertion order is the display order on the overlay.
+        self._regions: Dict[str, RegionText] = {name: RegionText() for name in region_names}
+        # What each region showed before its current line, for withdraw().
+        self._previous: Dict[Optional[str], RegionText] = {}
+        self._version = 0
+        self._listeners: List[StateListener] = []
 
-    def update(self, source_text: str, translated_text: str) -> None:
+    @property
+    def version(self) -> int:
         with self._lock:
-            self._source_text = source_text
-            self._translated_text = translated_text
+            return self._version
+
+    def add_listener(self, listener: StateListener) -> None:
+        # Listeners run on the updating thread, outside the lock, with the new
+        # version; they should only hand off (e.g. post a Qt event).
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: StateListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def show_source(self, line_id: int, source_text: str, region: Optional[str] = None) -> bool:
+        # First phase: the recognized text, shown while it is translated.
+        return self._apply(RegionText(source_text, "", line_id, pending=True), region)
+
+    def show_translation(
+        self,
+        line_id: int,
+        source_text: str,
+        translated_text: str,
+        region: Optional[str] = None,
+    ) -> bool:
+        # Second phase. Ignored once a newer line is on screen, so a slow or
+        # out-of-order translation never replaces newer text.
+        return self._apply(RegionText(source_text, translated_text, line_id), region)
+
+    def update(self, source_text: str, translated_text: str, region: Optional[str] = None) -> None:
+        # Unconditional update that keeps the current line ID.
+        self._apply(RegionText(source_text, translated_text), region, force=True)
+
+    def withdraw(self, line_id: int, region: Optional[str] = None) -> bool:
+        # Takes back a line that will never be translated (e.g. a preview of
+        # text that turned out to be a repeat) and restores what it replaced.
+        with self._lock:
+            current = self._current(region)
+            previous = self._previous.get(region)
+            if previous is None or current.line_id != line_id:
+                return False
+            del self._previous[region]
+            version, listeners = self._store(previous, region)
+        self._notify(version, listeners)
+        return True
 
     def get_snapshot(self) -> OverlaySnapshot:
         with self._lock:
             return OverlaySnapshot(
-                source_text=self._source_text,
-                translated_text=self._translated_text,
+                source_text=self._latest.source_text,
+                translated_text=self._latest.translated_text,
+                regions={name: replace(text) for name, text in self._regions.items()},
+                version=self._version,
+                line_id=self._latest.line_id,
+                pending=self._latest.pending,
             )
+
+    def _current(self, region: Optional[str]) -> RegionText:
+        return self._latest if region is None else self._regions.get(region, RegionText())
+
+    def _apply(self, text: RegionText, region: Optional[str], force: bool = False) -> bool:
+        with self._lock:
+            current = self._current(region)
+            if force:
+                text.line_id = current.line_id
+            elif text.line_id < current.line_id:
+                # The line a preview replaced may still get its translation;
+                # keep it so withdraw() restores the translated text.
+                previous = self._previous.get(region)
+                if previous is not None and previous.line_id == text.line_id and not text.pending:
+                    self._previous[region] = text
+                return False
+            elif text.line_id == current.line_id and text.pending and not current.pending:
+                # The translation for this line already arrived first.
+                return False
+            if text.line_id > current.line_id:
+                self._previous[region] = current
+            version, listeners = self._store(text, region)
+        self._notify(version, listeners)
+        return True
+
+    def _store(self, text: RegionText, region: Optional[str]) -> Tuple[int, List[StateListener]]:
+        # Called under the lock; returns no listeners when nothing changed.
+        unchanged = self._current(region) == text and self._latest == text
+        if region is not None:
+            self._regions[region] = text
+        self._latest = text
+        if unchanged:
+            return self._version, []
+        self._version += 1
+        return self._version, list(self._listeners)
+
+    @staticmethod
+    def _notify(version: int, listeners: List[StateListener]) -> None:
+        for listener in listeners:
+            try:
+                listener(version)
+            except Exception as exc:
+                print(f"Overlay state listener failed: {exc}")
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import time
 from dataclasses import dataclass
-from difflib import SequenceMatcher
+from typing import Optional
+
+from .similarity import is_similar, normalize_text
 
 
 @dataclass
@@ -13,22 +15,25 @@ class TextDeduplicator:
     def __post_init__(self) -> None:
         self._last_text = ""
         self._last_emit_time = 0.0
+        self.suppressed = 0
 
-    def should_emit(self, text: str) -> bool:
-        text = text.strip()
+    def should_emit(self, text: str, now: Optional[float] = None) -> bool:
+        # now defaults to the monotonic clock; offline runs pass media time.
+        text = normalize_text(text)
         if not text:
             return False
 
-        now = time.monotonic()
-        if now - self._last_emit_time < self.min_interval_sec:
+        now = time.monotonic() if now is None else now
+        if self._last_text and now - self._last_emit_time < self.min_interval_sec:
+            self.suppressed += 1
             return False
 
         if not self._last_text:
             self._remember(text, now)
             return True
 
-        ratio = SequenceMatcher(None, self._last_text, text).ratio()
-        if ratio >= self.similarity_threshold:
+        if is_similar(self._last_text, text, self.similarity_threshold):
+            self.suppressed += 1
             return False
 
         self._remember(text, now)
@@ -37,3 +42,72 @@ class TextDeduplicator:
     def _remember(self, text: str, now: float) -> None:
         self._last_text = text
         self._last_emit_time = now
+
+
+def is_prefix_growth(previous: str, text: str, min_similarity: float = 0.85) -> bool:
+    if len(text) <= len(previous) or not previous:
+        return False
+    head = text[: len(previous)]
+    if head == previous:
+        return True
+    return is_similar(previous, head, min_similarity)
+
+
+@dataclass
+class TypewriterStabilizer:
+    settle_sec: float = 0.5
+    min_similarity: float = 0.85
+
+    def __post_init__(self) -> None:
+        self._pending = ""
+        self._changed_at = 0.0
+        self._released = True
+        self.held = 0
+
+    @property
+    def pending(self) -> str:
+        return "" if self._released else self._pending
+
+    @property
+    def release_at(self) -> Optional[float]:
+        if self._released or not self._pending:
+            return None
+        return self._changed_at + self.settle_sec
+
+    def observe(self, text: str, now: Optional[float] = None) -> Optional[str]:
+        now = time.monotonic() if now is None else now
+        text = normalize_text(text)
+        if not text or text == self._pending:
+            return self.poll(now)
+
+        if not self._released:
+            if is_prefix_growth(self._pending, text, self.min_similarity):
+                # Still typing: restart the settle window.
+                self._pending = text
+                self._changed_at = now
+                self.held += 1
+                return None
+
+            if is_similar(self._pending, text, self.min_similarity):
+                # OCR noise on the same line; keep the window running.
+                self._pending = text
+                return self.poll(now)
+
+        # Unrelated text: the previous line was skipped past before it settled,
+        # but it was complete, so hand it over rather than losing it.
+        previous = None if self._released else self._pending
+        self._pending = text
+        self._changed_at = now
+        self._released = False
+        if previous is not None:
+            return previous
+        return self.poll(now)
+
+    def poll(self, now: Optional[float] = None) -> Optional[str]:
+        if self._released or not self._pending:
+            return None
+        now = time.monotonic() if now is None else now
+        if now - self._changed_at < self.settle_sec:
+            return None
+        self._released = True
+        return self._pending
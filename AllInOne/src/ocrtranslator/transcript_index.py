@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_INDEX_NAME = "index.sqlite3"
+
+# Trigram FTS needs at least three characters; shorter queries use LIKE.
+_MIN_FTS_QUERY = 3
+
+_FIELDS = {
+    "both": None,
+    "source": "source_text",
+    "translated": "translated_text",
+}
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    session: str
+    window_id: int
+    entry_id: int
+    timestamp: str
+    region: Optional[str]
+    source_text: str
+    translated_text: str
+
+
+@dataclass
+class IndexStats:
+    files_seen: int = 0
+    files_read: int = 0
+    entries_added: int = 0
+    seconds: float = 0.0
+
+
+class TranscriptIndex:
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                head TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                session TEXT NOT NULL,
+                window_id INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                region TEXT,
+                source_text TEXT NOT NULL,
+                translated_text TEXT NOT NULL,
+                UNIQUE (session, entry_id)
+            );
+            """
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+        if "head" not in columns:
+            # Indexes created before files were identified by their first line.
+            self._db.execute("ALTER TABLE files ADD COLUMN head TEXT NOT NULL DEFAULT ''")
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+                " source_text, translated_text, content='entries', content_rowid='id', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite older than 3.34 has no trigram tokenizer.
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+                " source_text, translated_text, content='entries', content_rowid='id')"
+            )
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN"
+            " INSERT INTO entries_fts (rowid, source_text, translated_text)"
+            " VALUES (new.id, new.source_text, new.translated_text);"
+            " END"
+        )
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def update(self, log_dir: str) -> IndexStats:
+        # Only bytes past the stored offset of each file are read; rotated
+        # .gz parts are read once. Entries already indexed from the live file
+        # before it rotated are skipped by the (session, entry_id) key.
+        started = time.perf_counter()
+        stats = IndexStats()
+        for path in sorted(Path(log_dir).glob("session_*/transcript*.jsonl*")):
+            if path.suffix not in (".jsonl", ".gz"):
+                continue
+            stats.files_seen += 1
+            stat = path.stat()
+            row = self._db.execute("SELECT offset, size, mtime, head FROM files WHERE path=?", (str(path),)).fetchone()
+            offset = 0
+            head = "" if path.suffix == ".gz" else _head_digest(path)
+            if row is not None:
+                offset, size, mtime, known_head = row
+                if stat.st_size == size and stat.st_mtime == mtime:
+                    continue
+                # A different first line means the live file rotated and
+                # was recreated, even if it has since grown past the offset.
+                if path.suffix == ".gz" or stat.st_size < offset or (known_head and head != known_head):
+                    offset = 0
+
+            stats.files_read += 1
+            if path.suffix == ".gz":
+                with gzip.open(path, "rb") as fp:
+                    data = fp.read()
+                lines, consumed = data.splitlines(), stat.st_size
+            else:
+                lines, consumed = _read_complete_lines(path, offset)
+                consumed += offset
+
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO entries"
+                " (session, window_id, entry_id, timestamp, region, source_text, translated_text)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _parse_entries(path.parent.name, lines),
+            )
+            stats.entries_added += max(0, cursor.rowcount)
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, offset, size, mtime, head) VALUES (?, ?, ?, ?, ?)",
+                (str(path), consumed, stat.st_size, stat.st_mtime, head),
+            )
+            self._db.commit()
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def search(
+        self,
+        query: str,
+        field: str = "both",
+        limit: int = 20,
+        session: Optional[str] = None,
+    ) -> List[SearchHit]:
+        if field not in _FIELDS:
+            raise ValueError(f"Unknown search field: {field}")
+        query = query.strip()
+        if not query:
+            return []
+
+        column = _FIELDS[field]
+        params: List[object] = []
+        if len(query) >= _MIN_FTS_QUERY:
+            # A quoted phrase makes the trigram index behave as a substring match.
+            phrase = '"' + query.replace('"', '""') + '"'
+            match = f"{column} : {phrase}" if column else phrase
+            sql = (
+                "SELECT e.session, e.window_id, e.entry_id, e.timestamp, e.region,"
+                " e.source_text, e.translated_text"
+                " FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+                " WHERE entries_fts MATCH ?"
+            )
+            params.append(match)
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            columns = [column] if column else ["source_text", "translated_text"]
+            sql = (
+                "SELECT e.session, e.window_id, e.entry_id, e.timestamp, e.region,"
+                " e.source_text, e.translated_text FROM entries e WHERE ("
+                + " OR ".join(f"e.{name} LIKE ? ESCAPE '\\'" for name in columns)
+                + ")"
+            )
+            params.extend([pattern] * len(columns))
+
+        if session:
+            sql += " AND e.session = ?"
+            params.append(session)
+        sql += " ORDER BY e.session DESC, e.entry_id DESC LIMIT ?"
+        params.append(max(1, limit))
+        return [SearchHit(*row) for row in self._db.execute(sql, params)]
+
+
+def _head_digest(path: Path) -> str:
+    # The first line holds the session's first entry_id and timestamp, so it
+    # identifies this incarnation of the file. Empty until it is complete.
+    with path.open("rb") as fp:
+        first = fp.readline(65536)
+    if not first.endswith(b"\n"):
+        return ""
+    return hashlib.sha1(first).hexdigest()
+
+
+def _read_complete_lines(path: Path, offset: int) -> Tuple[List[bytes], int]:
+    # A line the writer has not finished flushing is left for the next run.
+    with path.open("rb") as fp:
+        fp.seek(offset)
+        data = fp.read()
+    end = data.rfind(b"\n") + 1
+    return data[:end].splitlines(), end
+
+
+def _parse_entries(session: str, lines: Iterable[bytes]) -> Iterator[Tuple[object, ...]]:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+            yield (
+                session,
+                int(payload["window_id"]),
+                int(payload["entry_id"]),
+                str(payload.get("timestamp", "")),
+                payload.get("region"),
+                str(payload.get("source_text", "")),
+                str(payload.get("translated_text", "")),
+            )
+        except (ValueError, KeyError, TypeError):
+            continue
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="run.py search",
+        description="Search every transcript session under the log directory",
+    )
+    parser.add_argument("query", type=str)
+    parser.add_argument("--field", type=str, default="both", choices=sorted(_FIELDS))
+    parser.add_argument("--log-dir", type=str, default="logs")
+    parser.add_argument("--index", type=str, default=None, help=f"Index path (default <log-dir>/{DEFAULT_INDEX_NAME})")
+    parser.add_argument("--session", type=str, default=None, help="Only search this session_YYYYmmdd_HHMMSS")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--no-update", action="store_true", help="Search the index as is, without ingesting new lines")
+    parser.add_argument("--json", action="store_true", help="Print hits as JSON lines")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    index = TranscriptIndex(args.index or str(Path(args.log_dir) / DEFAULT_INDEX_NAME))
+    try:
+        if not args.no_update:
+            stats = index.update(args.log_dir)
+            if stats.entries_added:
+                print(
+                    f"Indexed {stats.entries_added} new entries from {stats.files_read} files"
+                    f" in {stats.seconds * 1000:.1f} ms"
+                )
+
+        started = time.perf_counter()
+        hits = index.search(args.query, field=args.field, limit=args.limit, session=args.session)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        index.close()
+
+    for hit in hits:
+        if args.json:
+            print(json.dumps(asdict(hit), ensure_ascii=False))
+            continue
+        region = f" [{hit.region}]" if hit.region else ""
+        print(f"{hit.session} W{hit.window_id:04d} E{hit.entry_id:05d} {hit.timestamp}{region}")
+        print(f"  SRC: {hit.source_text}")
+        if hit.translated_text:
+            print(f"  TRN: {hit.translated_text}")
+    if not args.json:
+        print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+    return 0
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .similarity import normalize_text
+from .translator import BaseTranslator, find_layer
+
+CacheKey = Tuple[str, str, str, str]
+
+# Placed in the log directory unless a path is given, like the transcript index.
+DEFAULT_CACHE_NAME = "translations.sqlite3"
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    expired: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return (self.memory_hits + self.disk_hits) / lookups
+
+
+class TranslationCache:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_entries: int = 2048,
+        disk_entries: int = 100_000,
+        ttl_sec: float = 30 * 86400.0,
+    ) -> None:
+        self._memory_entries = max(0, memory_entries)
+        self._disk_entries = max(0, disk_entries)
+        self._ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[CacheKey, Tuple[str, float]]" = OrderedDict()
+        self._stores_since_trim = 0
+        self.stats = CacheStats()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " engine TEXT NOT NULL,"
+                " source_lang TEXT NOT NULL,"
+                " target_lang TEXT NOT NULL,"
+                " source_text TEXT NOT NULL,"
+                " translated_text TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (engine, source_lang, target_lang, source_text))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed_at)"
+            )
+            self._purge_expired()
+            self._db.commit()
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                translated, created_at = cached
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return translated
+                del self._memory[key]
+                self.stats.expired += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT translated_text, created_at FROM translations"
+                    " WHERE engine=? AND source_lang=? AND target_lang=? AND source_text=?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    translated, created_at = row
+                    if not self._is_expired(created_at, now):
+                        self._db.execute(
+                            "UPDATE translations SET accessed_at=?"
+                            " WHERE engine=? AND source_lang=? AND target_lang=? AND source_text=?",
+                            (now, *key),
+                        )
+                        self._db.commit()
+                        self._remember(key, translated, created_at)
+                        self.stats.disk_hits += 1
+                        return translated
+                    self.stats.expired += 1
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: CacheKey, translated: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, translated, now)
+            self.stats.stores += 1
+            if self._db is None:
+                return
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations"
+                " (engine, source_lang, target_lang, source_text, translated_text, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, translated, now, now),
+            )
+            self._stores_since_trim += 1
+            if self._stores_since_trim >= 256:
+                self._stores_since_trim = 0
+                self._purge_expired()
+                self._trim_disk()
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: CacheKey, translated: str, created_at: float) -> None:
+        if self._memory_entries == 0:
+            return
+        self._memory[key] = (translated, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+            self.stats.evicted += 1
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self._ttl_sec > 0 and now - created_at > self._ttl_sec
+
+    def _purge_expired(self) -> None:
+        assert self._db is not None
+        if self._ttl_sec > 0:
+            self._db.execute(
+                "DELETE FROM translations WHERE created_at < ?",
+                (time.time() - self._ttl_sec,),
+            )
+
+    def _trim_disk(self) -> None:
+        assert self._db is not None
+        if self._disk_entries == 0:
+            return
+        (count,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = count - self._disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM translations WHERE rowid IN"
+                " (SELECT rowid FROM translations ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.stats.evicted += excess
+
+
+class CachedTranslator(BaseTranslator):
+    def __init__(
+        self,
+        inner: BaseTranslator,
+        cache: TranslationCache,
+        engine: str,
+        source_lang: str,
+        target_lang: str,
+    ) -> None:
+        self._inner = inner
+        self.cache = cache
+        self._engine = engine
+        self._source_lang = source_lang.lower()
+        self._target_lang = target_lang.lower()
+
+    @property
+    def inner(self) -> BaseTranslator:
+        return self._inner
+
+    def translate_strict(self, text: str) -> str:
+        key = self._key(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Failures raise before reaching the cache, so source-text fallbacks
+        # are never stored as translations.
+        translated = self._inner.translate_strict(text)
+        self.cache.put(self._key(text, self._answered_by()), translated)
+        return translated
+
+    def translate_many_strict(self, texts: Sequence[str]) -> List[str]:
+        keys = [self._key(text) for text in texts]
+        found: Dict[CacheKey, str] = {}
+        missing: Dict[CacheKey, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = text
+            else:
+                found[key] = cached
+
+        if missing:
+            translated = self._inner.translate_many_strict(list(missing.values()))
+            engine = self._answered_by()
+            for (key, text), value in zip(missing.items(), translated):
+                self.cache.put(self._key(text, engine), value)
+                found[key] = value
+        return [found[key] for key in keys]
+
+    def warm_up(self) -> None:
+        self._inner.warm_up()
+
+    def close(self) -> None:
+        self._inner.close()
+        self.cache.close()
+
+    def _answered_by(self) -> str:
+        # With a hedge below, the secondary engine may have answered; its
+        # text is stored under its own name, never as the primary's.
+        layer = find_layer(self._inner, "answered_by")
+        engine = layer.answered_by if layer is not None else None
+        return engine or self._engine
+
+    def _key(self, text: str, engine: Optional[str] = None) -> CacheKey:
+        return (engine or self._engine, self._source_lang, self._target_lang, normalize_text(text))
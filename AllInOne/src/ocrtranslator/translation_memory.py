@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import gzip
+import heapq
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from operator import itemgetter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .similarity import may_be_similar, normalize_text, similarity_ratio
+from .translator import BaseTranslator, TranslationError
+
+
+# First code point of the CJK radicals block; anything above counts as CJK.
+_CJK_START = 0x2E80
+
+
+@dataclass
+class MemoryStats:
+    exact_hits: int = 0
+    fuzzy_hits: int = 0
+    misses: int = 0
+    over_budget: int = 0
+    seeded: int = 0
+
+
+class TranslationMemory:
+    def __init__(
+        self,
+        min_similarity: float = 0.9,
+        budget_ms: float = 2.0,
+        max_entries: int = 50_000,
+        min_length: int = 6,
+        max_candidates: int = 32,
+        probe_grams: int = 12,
+    ) -> None:
+        self._min_similarity = min_similarity
+        self._budget_sec = budget_ms / 1000.0
+        self._max_entries = max(1, max_entries)
+        self._min_length = min_length
+        self._max_candidates = max(1, max_candidates)
+        self._probe_grams = max(1, probe_grams)
+
+        self._lock = threading.Lock()
+        self._sources: List[str] = []
+        self._translations: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self.stats = MemoryStats()
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add(self, source_text: str, translated_text: str, replace: bool = True) -> None:
+        source = normalize_text(source_text)
+        translated = translated_text.strip()
+        if not source or not translated:
+            return
+        with self._lock:
+            index = self._exact.get(source)
+            if index is not None:
+                if replace:
+                    self._translations[index] = translated
+                return
+            if len(self._sources) >= self._max_entries:
+                return
+            index = len(self._sources)
+            self._sources.append(source)
+            self._translations.append(translated)
+            self._exact[source] = index
+            for gram in self._grams(source):
+                self._postings[gram].add(index)
+
+    def lookup(self, source_text: str) -> Optional[str]:
+        source = normalize_text(source_text)
+        if not source:
+            return None
+        deadline = time.perf_counter() + self._budget_sec
+        with self._lock:
+            index = self._exact.get(source)
+            if index is not None:
+                self.stats.exact_hits += 1
+                return self._translations[index]
+            if len(source) < self._min_length:
+                self.stats.misses += 1
+                return None
+
+            found = self._fuzzy(source, deadline)
+            if found is None:
+                self.stats.misses += 1
+                return None
+            self.stats.fuzzy_hits += 1
+            return self._translations[found]
+
+    def seed_from_transcripts(
+        self,
+        log_dir: str,
+        source_lang: str,
+        target_lang: str,
+    ) -> int:
+        # The entry cap keeps the most recent play, and a line seen in several
+        # sessions keeps its newest translation.
+        before = len(self)
+        for source_text, translated_text in _transcript_pairs(log_dir, source_lang, target_lang):
+            if len(self) >= self._max_entries:
+                break
+            self.add(source_text, translated_text, replace=False)
+        added = len(self) - before
+        self.stats.seeded += added
+        return added
+
+    def _fuzzy(self, source: str, deadline: float) -> Optional[int]:
+        grams = self._grams(source)
+        if not grams:
+            return None
+
+        # Only the rarest grams are probed: they are the most selective, and a
+        # line with a couple of OCR errors still shares most of them.
+        postings = heapq.nsmallest(
+            self._probe_grams,
+            (self._postings[gram] for gram in grams if gram in self._postings),
+            key=len,
+        )
+        counts: Counter = Counter()
+        for posting in postings:
+            counts.update(posting)
+            if time.perf_counter() > deadline:
+                self.stats.over_budget += 1
+                break
+
+        length = len(source)
+        best, best_ratio = None, self._min_similarity
+        for candidate, _ in heapq.nlargest(self._max_candidates, counts.items(), key=itemgetter(1)):
+            target = self._sources[candidate]
+            if 2.0 * min(length, len(target)) / (length + len(target)) < best_ratio:
+                continue
+            if not may_be_similar(source, target, best_ratio):
+                continue
+            ratio = similarity_ratio(source, target)
+            if ratio >= best_ratio and (best is None or ratio > best_ratio):
+                best, best_ratio = candidate, ratio
+            if time.perf_counter() > deadline:
+                self.stats.over_budget += 1
+                break
+        return best
+
+    @staticmethod
+    def _grams(text: str) -> Set[str]:
+        # Kana and kanji are selective on their own, so pairs are enough;
+        # alphabetic text needs triples to keep the posting lists short.
+        n = 2 if any(ord(char) >= _CJK_START for char in text) else 3
+        if len(text) <= n:
+            return {text} if text else set()
+        return {text[index : index + n] for index in range(len(text) - n + 1)}
+
+
+def _transcript_pairs(log_dir: str, source_lang: str, target_lang: str) -> Iterator[Tuple[str, str]]:
+    root = Path(log_dir)
+    if not root.is_dir():
+        return
+    # Newest session, part and line first.
+    for session in sorted(root.glob("session_*"), reverse=True):
+        for path in sorted(session.glob("transcript*.jsonl*"), reverse=True):
+            opener = gzip.open if path.suffix == ".gz" else open
+            try:
+                with opener(path, "rt", encoding="utf-8") as fp:
+                    lines = fp.readlines()
+            except OSError:
+                continue
+            for line in reversed(lines):
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    continue
+                if payload.get("source_lang") != source_lang or payload.get("target_lang") != target_lang:
+                    continue
+                source_text = payload.get("source_text") or ""
+                translated_text = payload.get("translated_text") or ""
+                # Empty means the line was superseded before it was
+                # translated; equal text is a failed-translation fallback.
+                if translated_text and translated_text != source_text:
+                    yield source_text, translated_text
+
+
+class MemoryTranslator(BaseTranslator):
+    def __init__(self, inner: BaseTranslator, memory: TranslationMemory) -> None:
+        self._inner = inner
+        self.memory = memory
+
+    @property
+    def inner(self) -> BaseTranslator:
+        return self._inner
+
+    def translate_strict(self, text: str) -> str:
+        remembered = self.memory.lookup(text)
+        if remembered is not None:
+            return remembered
+        translated = self._inner.translate_strict(text)
+        self.memory.add(text, translated)
+        return translated
+
+    def translate_many_strict(self, texts: Sequence[str]) -> List[str]:
+        results: List[Optional[str]] = [self.memory.lookup(text) for text in texts]
+        missing = [index for index, value in enumerate(results) if value is None]
+        if missing:
+            translated = self._inner.translate_many_strict([texts[index] for index in missing])
+            if len(translated) != len(missing):
+                raise TranslationError("Translator returned a different number of texts")
+            for index, value in zip(missing, translated):
+                self.memory.add(texts[index], value)
+                results[index] = value
+        return [value or "" for value in results]
+
+    def warm_up(self) -> None:
+        self._inner.warm_up()
+
+    def close(self) -> None:
+        self._inner.close()
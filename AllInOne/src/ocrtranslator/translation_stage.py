@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .translator import BaseTranslator
+
+
+@dataclass
+class TranslationJob:
+    seq: int
+    source_text: str
+    submitted_at: float
+    key: str = ""
+    captured_at: float = 0.0
+    ocr_sec: float = 0.0
+    line_id: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+
+ResultCallback = Callable[[TranslationJob, str, bool], None]
+DropCallback = Callable[[TranslationJob], None]
+
+
+class TranslationStage:
+    def __init__(
+        self,
+        translator: BaseTranslator,
+        on_result: ResultCallback,
+        on_dropped: Optional[DropCallback] = None,
+        max_pending: int = 4,
+    ) -> None:
+        self._translator = translator
+        self._on_result = on_result
+        self._on_dropped = on_dropped
+        self._max_pending = max(1, max_pending)
+
+        self._cond = threading.Condition()
+        self._pending: Deque[TranslationJob] = deque()
+        # Pushed out of a full queue; reported by the worker so drops and
+        # results reach the callbacks in submission order.
+        self._overflow: List[TranslationJob] = []
+        self._stop = False
+        # Set when stop() gave up waiting; a late result is then discarded.
+        self._detached = False
+        self._thread: Optional[threading.Thread] = None
+        self._seq = 0
+        self._latest_by_key: Dict[str, int] = {}
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.stale = 0
+        self.max_depth = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._detached = False
+        self._thread = threading.Thread(target=self._run, name="translation-stage", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        # By default waits for the request in flight (bounded by the
+        # translator's own timeout), so its result is reported before the
+        # caller closes whatever the callbacks write to.
+        with self._cond:
+            self._stop = True
+            leftovers = sorted([*self._overflow, *self._pending], key=lambda item: item.seq)
+            self._overflow = []
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                with self._cond:
+                    self._detached = True
+        for job in leftovers:
+            self._drop(job)
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    @property
+    def latest_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    @property
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._pending and not self._overflow and self.completed + self.dropped >= self.submitted
+
+    def submit(
+        self,
+        source_text: str,
+        key: str = "",
+        captured_at: float = 0.0,
+        ocr_sec: float = 0.0,
+        line_id: int = 0,
+    ) -> TranslationJob:
+        with self._cond:
+            self._seq += 1
+            job = TranslationJob(
+                seq=self._seq,
+                source_text=source_text,
+                submitted_at=time.monotonic(),
+                key=key,
+                captured_at=captured_at,
+                ocr_sec=ocr_sec,
+                line_id=line_id,
+            )
+            self._latest_by_key[key] = job.seq
+            self._pending.append(job)
+            while len(self._pending) > self._max_pending:
+                self._overflow.append(self._pending.popleft())
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self._pending))
+            self._cond.notify()
+        return job
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._overflow and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                # Latest wins per key (one key per region): anything older than
+                # the newest pending line of its key is superseded before a
+                # request is ever sent for it.
+                newest: Dict[str, TranslationJob] = {}
+                for job in self._pending:
+                    newest[job.key] = job
+                batch = sorted(newest.values(), key=lambda item: item.seq)
+                dropped = self._overflow + [job for job in self._pending if newest[job.key] is not job]
+                self._overflow = []
+                self._pending.clear()
+
+            outcomes: List[Tuple[TranslationJob, Optional[str]]] = [(job, None) for job in dropped]
+            if batch:
+                results: List[Optional[str]]
+                try:
+                    results = list(self._translate(batch))
+                except Exception as exc:
+                    # Translators turn TranslationError into a fallback; anything
+                    # else (cache, memory, a short batch) drops this batch
+                    # instead of ending the thread with every later line pending.
+                    print(f"Translation failed: {type(exc).__name__}: {exc}")
+                    results = [None] * len(batch)
+                outcomes.extend(zip(batch, results))
+
+            # Everything taken in one pass is newer than the previous pass,
+            # so reporting each pass in seq order keeps the callbacks (and
+            # the transcript) in submission order.
+            for job, translated in sorted(outcomes, key=lambda item: item[0].seq):
+                with self._cond:
+                    if self._detached:
+                        return
+                if translated is None:
+                    self._drop(job)
+                    continue
+                with self._cond:
+                    is_stale = job.seq != self._latest_by_key.get(job.key)
+                    self.completed += 1
+                    if is_stale:
+                        self.stale += 1
+
+                try:
+                    self._on_result(job, translated, is_stale)
+                except Exception as exc:
+                    print(f"Translation result handler failed: {exc}")
+
+    def _translate(self, batch: List[TranslationJob]) -> List[str]:
+        started_at = time.monotonic()
+        # Several regions changing together go out in one request.
+        if len(batch) == 1:
+            results: List[str] = [self._translator.translate(batch[0].source_text)]
+        else:
+            results = self._translator.translate_many([job.source_text for job in batch])
+        finished_at = time.monotonic()
+        if len(results) != len(batch):
+            raise ValueError(f"translator returned {len(results)} results for {len(batch)} lines")
+        for job in batch:
+            job.started_at = started_at
+            job.finished_at = finished_at
+        return results
+
+    def _drop(self, job: TranslationJob) -> None:
+        with self._cond:
+            self.dropped += 1
+        if self._on_dropped is None:
+            return
+        try:
+            self._on_dropped(job)
+        except Exception as exc:
+            print(f"Translation drop handler failed: {exc}")
@@ -1,19 +1,62 @@
 from __future__ import annotations
 
+import random
+import time
 from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .config import TranslationConfig
 
 
+class TranslationError(RuntimeError):
+    pass
+
+
 class BaseTranslator:
+    # Failed requests, and texts shown untranslated because of them.
+    failures = 0
+    fallbacks = 0
+
     def translate(self, text: str) -> str:
+        if not text:
+            return ""
+        try:
+            return self.translate_strict(text)
+        except TranslationError:
+            self.failures += 1
+            self.fallbacks += 1
+            return text
+
+    def translate_many(self, texts: Sequence[str]) -> List[str]:
+        pending = [text for text in texts if text]
+        if not pending:
+            return ["" for _ in texts]
+        try:
+            translated = iter(self.translate_many_strict(pending))
+        except TranslationError:
+            self.failures += 1
+            self.fallbacks += len(pending)
+            translated = iter(pending)
+        return [next(translated) if text else "" for text in texts]
+
+    def translate_strict(self, text: str) -> str:
         raise NotImplementedError
 
+    def translate_many_strict(self, texts: Sequence[str]) -> List[str]:
+        return [self.translate_strict(text) for text in texts]
+
+    def warm_up(self) -> None:
+        return
+
+    def close(self) -> None:
+        return
+
 
 class IdentityTranslator(BaseTranslator):
-    def translate(self, text: str) -> str:
+    def translate_strict(self, text: str) -> str:
         return text
 
 
@@ -28,13 +71,18 @@ class GoogleWebTranslator(BaseTranslator):
 
         self._translator = GoogleTranslator(source=source_lang, target=target_lang)
 
-    def translate(self, text: str) -> str:
-        if not text:
-            return ""
+    def translate_strict(self, text: str) -> str:
         try:
-            return self._translator.translate(text)
-        except Exception:
-            return text
+            translated = self._translator.translate(text)
+        except Exception as exc:
+            raise TranslationError(f"Google translation failed: {exc}") from exc
+        if not translated:
+            raise TranslationError("Google translation returned no text")
+        return translated
+
+
+_DEEPL_RETRY_STATUS = {429, 500, 502, 503, 504}
+_DEEPL_MAX_TEXTS = 50
 
 
 @dataclass
@@ -42,40 +90,154 @@ class DeepLTranslator(BaseTranslator):
     api_key: str
     source_lang: str
     target_lang: str
+    url: Optional[str] = None
+    timeout_sec: float = 8.0
+    max_retries: int = 2
+    backoff_sec: float = 0.25
+    pool_size: int = 4
 
     def __post_init__(self) -> None:
-        self._url = (
+        self._url = self.url or (
             "https://api-free.deepl.com/v2/translate"
             if self.api_key.endswith(":fx")
             else "https://api.deepl.com/v2/translate"
         )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers["Authorization"] = f"DeepL-Auth-Key {self.api_key}"
 
-    def translate(self, text: str) -> str:
-        if not text:
-            return ""
+    def translate_strict(self, text: str) -> str:
+        return self.translate_many_strict([text])[0]
 
-        payload = {
-            "auth_key": self.api_key,
-            "text": text,
-            "source_lang": self.source_lang.upper(),
-            "target_lang": self.target_lang.upper(),
-        }
+    def translate_many_strict(self, texts: Sequence[str]) -> List[str]:
+        results: List[str] = []
+        for start in range(0, len(texts), _DEEPL_MAX_TEXTS):
+            chunk = texts[start : start + _DEEPL_MAX_TEXTS]
+            payload: List[Tuple[str, str]] = [("text", text) for text in chunk]
+            payload.append(("source_lang", self.source_lang.upper()))
+            payload.append(("target_lang", self.target_lang.upper()))
 
+            translations = self._post(payload).get("translations", [])
+            if len(translations) != len(chunk) or any("text" not in item for item in translations):
+                raise TranslationError("DeepL response contained no translations")
+            results.extend(item["text"] for item in translations)
+        return results
+
+    def warm_up(self) -> None:
+        # Opens the pooled TLS connection so the first line skips the
+        # handshake. The status does not matter, only the connection.
         try:
-            response = requests.post(self._url, data=payload, timeout=8)
-            response.raise_for_status()
-            data = response.json()
-            translations = data.get("translations", [])
-            if not translations:
-                return text
-            return translations[0].get("text", text)
-        except Exception:
-            return text
+            self._session.head(self._url, timeout=self.timeout_sec).close()
+        except requests.RequestException as exc:
+            print(f"DeepL warm-up failed: {exc}")
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _post(self, payload: List[Tuple[str, str]]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            try:
+                response = self._session.post(self._url, data=payload, timeout=self.timeout_sec)
+            except requests.RequestException as exc:
+                if attempt >= self.max_retries:
+                    raise TranslationError(f"DeepL request failed: {exc}") from exc
+                self._sleep_before_retry(attempt, None)
+                attempt += 1
+                continue
+
+            if response.status_code in _DEEPL_RETRY_STATUS and attempt < self.max_retries:
+                # Hands the pooled connection back before waiting.
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+                self._sleep_before_retry(attempt, retry_after)
+                attempt += 1
+                continue
+
+            try:
+                response.raise_for_status()
+                return response.json()
+            except Exception as exc:
+                raise TranslationError(f"DeepL request failed: {exc}") from exc
+
+    def _sleep_before_retry(self, attempt: int, retry_after: Optional[str]) -> None:
+        delay = self.backoff_sec * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(min(delay, self.timeout_sec))
+
+
+def find_layer(translator: BaseTranslator, attribute: str) -> Optional[Any]:
+    # Translators wrap each other (memory -> cache -> hedge -> engine).
+    layer: Optional[Any] = translator
+    while layer is not None:
+        if hasattr(layer, attribute):
+            return layer
+        layer = getattr(layer, "inner", None)
+    return None
 
 
 def build_translator(config: TranslationConfig) -> BaseTranslator:
     engine = config.engine.lower()
+    translator = _build_engine(config, engine)
+    if engine == "none":
+        return translator
+
+    hedge = (config.hedge_engine or "").lower()
+    if hedge and hedge != engine:
+        from .hedging import HedgedTranslator
+
+        translator = HedgedTranslator(
+            translator,
+            _build_engine(config, hedge),
+            primary_name=engine,
+            secondary_name=hedge,
+            delay_sec=config.hedge_delay_sec,
+            adaptive=config.hedge_adaptive,
+            min_delay_sec=config.hedge_min_delay_sec,
+            max_delay_sec=config.hedge_max_delay_sec,
+        )
+
+    if config.cache_enabled:
+        from .translation_cache import CachedTranslator, TranslationCache
+
+        cache = TranslationCache(
+            path=config.cache_path,
+            memory_entries=config.cache_memory_entries,
+            disk_entries=config.cache_disk_entries,
+            ttl_sec=config.cache_ttl_sec,
+        )
+        translator = CachedTranslator(
+            inner=translator,
+            cache=cache,
+            engine=config.engine.lower(),
+            source_lang=config.source_lang,
+            target_lang=config.target_lang,
+        )
+
+    if not config.memory_enabled:
+        return translator
+
+    # Above the exact cache, so a fuzzy memory hit (possibly a different
+    # sentence) is never stored as the exact translation of the query.
+    from .translation_memory import MemoryTranslator, TranslationMemory
+
+    memory = TranslationMemory(
+        min_similarity=config.memory_min_similarity,
+        budget_ms=config.memory_budget_ms,
+        max_entries=config.memory_max_entries,
+    )
+    if config.memory_seed_dir:
+        memory.seed_from_transcripts(config.memory_seed_dir, config.source_lang, config.target_lang)
+    return MemoryTranslator(translator, memory)
+
 
+def _build_engine(config: TranslationConfig, engine: str) -> BaseTranslator:
     if engine == "none":
         return IdentityTranslator()
 
@@ -86,6 +248,9 @@ def build_translator(config: TranslationConfig) -> BaseTranslator:
             api_key=config.deepl_api_key,
             source_lang=config.source_lang,
             target_lang=config.target_lang,
+            url=config.deepl_url,
+            timeout_sec=config.request_timeout_sec,
+            max_retries=config.max_retries,
         )
 
     if engine == "google":
@@ -94,4 +259,4 @@ def build_translator(config: TranslationConfig) -> BaseTranslator:
             target_lang=config.target_lang,
         )
 
-    raise ValueError(f"Unknown translation engine: {config.engine}")
+    raise ValueError(f"Unknown translation engine: {engine}")